@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Rule-based validation of parsed DNA batches.
+
+Each rule's compiled field table (utils.dna_calculator) is turned into a
+RuleValidator once: numeric fields check min/max (hz_min/hz_max,
+index_max, ...), class fields check membership in the expanded class order
+("Z-A", "f-a", "T-R-F-C", sign "P/N", ...). Whole columns are checked at
+once and every record gets a violation bitmask, bit i set when field i is
+out of range, instead of raising on the first error.
+"""
+import numpy as np
+
+from utils.dna_calculator import DNACalculator, INT
+from utils.dna_batch import column_name
+
+class RuleValidator:
+    def __init__(self, rule):
+        self.rule = rule
+        self.fields = rule.fields
+        self.names = tuple(column_name(f) for f in self.fields)
+        # One bit per field, plus MALFORMED for rows parse_batch flagged.
+        self.malformed_bit = len(self.fields)
+        self.mask_dtype = np.uint32 if self.malformed_bit < 32 else np.uint64
+        self.MALFORMED = self.mask_dtype(1) << self.mask_dtype(self.malformed_bit)
+        self._checks = []
+        for i, field in enumerate(self.fields):
+            bit = self.mask_dtype(1) << self.mask_dtype(i)
+            if field.kind == INT:
+                lo, hi = field.domain
+                self._checks.append((column_name(field), bit, INT, (lo, hi)))
+            else:
+                self._checks.append((column_name(field), bit, field.kind, np.array(field.domain)))
+
+    def check(self, records, ok=None):
+        """
+        Return the per-record violation bitmask for a structured array of
+        this rule's fields (e.g. RuleBatch.records). Rows where `ok` is False
+        get the MALFORMED bit and no field bits.
+        """
+        mask = np.zeros(len(records), dtype=self.mask_dtype)
+        for name, bit, kind, domain in self._checks:
+            column = records[name]
+            if kind == INT:
+                lo, hi = domain
+                bad = column < lo
+                if hi is not None:
+                    bad |= column > hi
+            else:
+                bad = ~np.isin(column, domain)
+            mask[bad] |= bit
+        if ok is not None:
+            mask[~ok] = self.MALFORMED
+        return mask
+
+    def check_batch(self, batch):
+        """
+        Bitmask for a RuleBatch from DNACalculator.parse_batch.
+        """
+        return self.check(batch.records, batch.ok)
+
+    def describe(self, mask_value):
+        """
+        Names of the fields flagged in one mask value ('<malformed>' for
+        MALFORMED).
+        """
+        mask_value = int(mask_value)
+        if mask_value & int(self.MALFORMED):
+            return ['<malformed>']
+        return [name for i, name in enumerate(self.names) if mask_value >> i & 1]
+
+    def counts(self, mask):
+        """
+        { field_name: number of records violating it } for a mask array.
+        """
+        out = {}
+        for i, name in enumerate(self.names):
+            out[name] = int(np.count_nonzero(mask & (self.mask_dtype(1) << self.mask_dtype(i))))
+        out['<malformed>'] = int(np.count_nonzero(mask & self.MALFORMED))
+        return out
+
+class ValidationEngine:
+    def __init__(self, calculator=None, rules_folder='rules'):
+        """
+        Compile a RuleValidator for every rule of `calculator` (or of the
+        rules found in `rules_folder`).
+        """
+        self.calculator = calculator or DNACalculator(rules_folder=rules_folder)
+        self.validators = {
+            rule.variable: RuleValidator(rule) for rule in self.calculator.rules.values()
+        }
+
+    def validate(self, parsed):
+        """
+        Validate the output of DNACalculator.parse_batch.
+        Returns { variable_name: mask_array } aligned with each RuleBatch.
+        """
+        return {
+            variable: self.validators[variable].check_batch(batch)
+            for variable, batch in parsed.items() if variable is not None
+        }
+
+    def validate_strings(self, dna_strings):
+        """
+        Parse and validate in one go. Returns (parsed, masks).
+        """
+        parsed = self.calculator.parse_batch(dna_strings)
+        return parsed, self.validate(parsed)
+
+    def filter_valid(self, parsed, masks=None):
+        """
+        Keep only clean rows. Returns { variable_name: (index, records) }.
+        """
+        masks = self.validate(parsed) if masks is None else masks
+        out = {}
+        for variable, mask in masks.items():
+            batch = parsed[variable]
+            keep = mask == 0
+            out[variable] = (batch.index[keep], batch.records[keep])
+        return out
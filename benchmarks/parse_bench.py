@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+parse_bench.py
+
+Parse / serialize / ingest throughput benchmark driven by rules/*.json.
+
+Workloads are generated from the compiled rules (every field drawn inside its
+min/max or class order):
+
+  • single      – one rule only (Volume by default, see --rule)
+  • mixed       – every rule, uniformly interleaved
+  • repetitive  – mixed, but long runs of identical windows (sustained notes)
+  • random      – mixed, every string freshly drawn
+
+For each workload and input size it times:
+
+  • Rule.parse / Rule.serialize              (single-rule loop)
+  • DNACalculator.parse                      (with prefix dispatch)
+  • DNACalculator.parse (parse cache)        (LRU memoization)
+  • DNACalculator.parse_batch                (columnar NumPy decode)
+  • dna_ui.main end-to-end                   (JSON + CSV, in a scratch project)
+
+Results are printed and written as JSON (--out) so runs can be compared.
+
+Usage:
+    python benchmarks/parse_bench.py [--sizes 1000 10000 100000] [--out bench.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from utils.dna_calculator import DNACalculator, INT  # noqa: E402
+from utils import dna_ui  # noqa: E402
+
+RULES_FOLDER = os.path.join(REPO_ROOT, 'rules')
+
+# ─── Workload generation ──────────────────────────────────────────────────────
+
+def random_dna(rule, rng):
+    """
+    One valid DNA string for `rule`, every field drawn from its domain.
+    """
+    parts = [rule.prefix]
+    for field in rule.fields:
+        if field.kind == INT:
+            lo, hi = field.domain
+            hi = 10 ** field.width - 1 if hi is None else hi
+            parts.append(str(rng.randint(lo, hi)).zfill(field.width))
+        else:
+            parts.append(rng.choice(field.domain))
+    return ''.join(parts)
+
+def make_workload(kind, calculator, n, rng, rule_name='Volume'):
+    rules = list(calculator.rules.values())
+    if kind == 'single':
+        rule = calculator.by_variable[rule_name]
+        return [random_dna(rule, rng) for _ in range(n)]
+    if kind == 'random':
+        return [random_dna(rng.choice(rules), rng) for _ in range(n)]
+    if kind == 'mixed':
+        # A pool of distinct windows per rule, interleaved rule by rule
+        pool = {rule.prefix: [random_dna(rule, rng) for _ in range(64)] for rule in rules}
+        return [rng.choice(pool[rules[i % len(rules)].prefix]) for i in range(n)]
+    if kind == 'repetitive':
+        # Each rule holds its value for 8–64 windows before changing
+        current = {rule.prefix: random_dna(rule, rng) for rule in rules}
+        remaining = {rule.prefix: rng.randint(8, 64) for rule in rules}
+        out = []
+        for i in range(n):
+            rule = rules[i % len(rules)]
+            if remaining[rule.prefix] == 0:
+                current[rule.prefix] = random_dna(rule, rng)
+                remaining[rule.prefix] = rng.randint(8, 64)
+            remaining[rule.prefix] -= 1
+            out.append(current[rule.prefix])
+        return out
+    raise ValueError(f"Unknown workload '{kind}'")
+
+# ─── Timing ───────────────────────────────────────────────────────────────────
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_rule(calculator, strings, repeat):
+    rule = calculator.match(strings[0])
+    parsed = [rule.parse(s) for s in strings]
+    return {
+        'Rule.parse': best_of(lambda: [rule.parse(s) for s in strings], repeat),
+        'Rule.serialize': best_of(lambda: [rule.serialize(v) for v in parsed], repeat),
+    }
+
+def bench_calculator(strings, repeat):
+    plain = DNACalculator(rules_folder=RULES_FOLDER)
+    results = {
+        'DNACalculator.parse': best_of(lambda: [plain.parse(s) for s in strings], repeat),
+    }
+
+    def cached_run():
+        calc = DNACalculator(rules_folder=RULES_FOLDER, parse_cache_size=dna_ui.PARSE_CACHE_SIZE)
+        for s in strings:
+            calc.parse(s)
+    results['DNACalculator.parse (cached)'] = best_of(cached_run, repeat)
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return results
+    results['DNACalculator.parse_batch'] = best_of(lambda: plain.parse_batch(strings), repeat)
+    return results
+
+def bench_end_to_end(strings, repeat):
+    """
+    Time dna_ui.main() on `strings` inside a scratch project folder.
+    """
+    root = tempfile.mkdtemp(prefix='sonicdna-bench-')
+    cwd = os.getcwd()
+    try:
+        shutil.copytree(RULES_FOLDER, os.path.join(root, 'rules'))
+        raw = os.path.join(root, 'data', 'raw')
+        os.makedirs(raw)
+        with open(os.path.join(raw, 'toSequence.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(strings) + '\n')
+        os.chdir(root)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return {'dna_ui.main': best_of(dna_ui.main, repeat)}
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="SonicDNA parse/serialize benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--workloads', nargs='+',
+                        default=['single', 'mixed', 'repetitive', 'random'])
+    parser.add_argument('--rule', default='Volume', help="Rule used by the 'single' workload.")
+    parser.add_argument('--repeat', type=int, default=3, help="Best of N runs per measurement.")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--skip-e2e', action='store_true', help="Skip the dna_ui.main run.")
+    parser.add_argument('--out', help="Write machine-readable results to this JSON file.")
+    args = parser.parse_args()
+
+    calculator = DNACalculator(rules_folder=RULES_FOLDER)
+    results = []
+    for kind in args.workloads:
+        for n in args.sizes:
+            rng = random.Random(args.seed)
+            strings = make_workload(kind, calculator, n, rng, args.rule)
+            timings = {}
+            if kind == 'single':
+                timings.update(bench_rule(calculator, strings, args.repeat))
+            timings.update(bench_calculator(strings, args.repeat))
+            if not args.skip_e2e:
+                timings.update(bench_end_to_end(strings, args.repeat))
+            for name, seconds in timings.items():
+                results.append({
+                    'workload': kind,
+                    'size': n,
+                    'benchmark': name,
+                    'seconds': seconds,
+                    'per_item_us': seconds / n * 1e6,
+                    'items_per_sec': n / seconds if seconds else None,
+                })
+                print(f"{kind:<11} {n:>8}  {name:<30} {seconds * 1000:9.2f} ms  "
+                      f"{seconds / n * 1e6:7.2f} µs/item")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': sys.version,
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'repeat': args.repeat,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results,
+            }, f, indent=2)
+        print(f"Results → {args.out}")
+
+if __name__ == '__main__':
+    main()
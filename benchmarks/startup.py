@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+startup.py
+
+Measures cold-start cost of the headless batch path in fresh interpreters:
+
+  • baseline     – `python -c pass`
+  • import main  – importing main.py (what `toongloom` / `python main.py` pay first)
+  • once         – a full `--once`-style batch run on a small input, in a
+                   scratch project folder with a copy of rules/
+
+It also reports whether any GUI/audio module (PySide6, numpy, scipy,
+sounddevice) was imported along the way; the headless path should load none.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("PySide6", "numpy", "scipy", "sounddevice")
+
+_REPORT_HEAVY = (
+    "import sys, json; "
+    f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+)
+
+SCENARIOS = {
+    "baseline": "pass",
+    "import main": f"import sys; sys.path.insert(0, {REPO_ROOT!r}); import main; " + _REPORT_HEAVY,
+    "once": (
+        f"import sys; sys.path.insert(0, {REPO_ROOT!r}); "
+        "from utils.dna_ui import main as run_batch; run_batch(); " + _REPORT_HEAVY
+    ),
+}
+
+def make_scratch_project(lines=100):
+    """
+    Create a throwaway project folder (rules/ copy + data/raw/toSequence.txt).
+    """
+    root = tempfile.mkdtemp(prefix="sonicdna-startup-")
+    shutil.copytree(os.path.join(REPO_ROOT, "rules"), os.path.join(root, "rules"))
+    raw = os.path.join(root, "data", "raw")
+    os.makedirs(raw)
+    with open(os.path.join(raw, "toSequence.txt"), "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(f"VOL{i % 1001:04d}0750712\n")
+    return root
+
+def time_scenario(code, cwd, runs):
+    """
+    Run `code` in `runs` fresh interpreters. Returns (timings_ms, heavy_modules).
+    """
+    timings = []
+    heavy = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        # The compiled rule cache lives in the scratch folder and goes with it
+        env = dict(os.environ, SONICDNA_CACHE_DIR=os.path.join(cwd, "cache"))
+        proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env,
+                              capture_output=True, text=True)
+        timings.append((time.perf_counter() - start) * 1000.0)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Scenario failed:\n{proc.stderr}")
+        last = proc.stdout.strip().splitlines()[-1:] if proc.stdout.strip() else []
+        if last and last[0].startswith("["):
+            heavy = json.loads(last[0])
+    return timings, heavy
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless start-up benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Interpreter launches per scenario.")
+    parser.add_argument("--json", help="Write machine-readable results to this file.")
+    args = parser.parse_args()
+
+    scratch = make_scratch_project()
+    results = {}
+    try:
+        for name, code in SCENARIOS.items():
+            timings, heavy = time_scenario(code, scratch, args.runs)
+            results[name] = {
+                "median_ms": statistics.median(timings),
+                "min_ms": min(timings),
+                "max_ms": max(timings),
+                "heavy_modules": heavy,
+            }
+            flag = f"  ← loaded {', '.join(heavy)}" if heavy else ""
+            print(f"{name:<12} median {results[name]['median_ms']:7.1f} ms  "
+                  f"(min {results[name]['min_ms']:.1f}, max {results[name]['max_ms']:.1f}){flag}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version, "runs": args.runs, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
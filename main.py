@@ -5,8 +5,8 @@ main.py
 – If run directly (python main.py), this will launch your PySide6 GUI (ui/main_window.py),
   but also start a background watcher that “watches” data/raw/toSequence.txt. Any time
   you append new DNA lines to that file, it automatically:
-     • calls dna_ui.main() → which parses all lines and writes JSON/CSV to data/output/
-     • clears toSequence.txt so those lines aren’t re‐parsed
+     • calls dna_ui.main() on just the newly appended lines → writes JSON/CSV to data/output/
+     • remembers its byte offset (toSequence.txt.offset) so those lines aren’t re‐parsed
 
 – If you want to run only a one‐time batch parse (no GUI), you can launch with
     python main.py --once
@@ -33,10 +33,13 @@ import time
 import threading
 import argparse
 
-# ─── Import the batch parser and the GUI window ───────────────────────────────
-from utils.dna_ui import main as run_batch
-from PySide6.QtWidgets import QApplication
-from ui.main_window import MainWindow
+# ─── Import the batch parser ──────────────────────────────────────────────────
+# The GUI stack (PySide6, and numpy/scipy/sounddevice via ui.music_panel) is
+# imported inside main() only when the GUI is launched, so `--once` runs start
+# with just what parsing needs.
+from utils.dna_ui import main as run_batch, worker_pool
+from utils.input_tailer import InputTailer
+from utils.metrics import METRICS, RunProfiler, enable as enable_metrics
 
 # ─── UTILITY FUNCTIONS ────────────────────────────────────────────────────────
 
@@ -45,27 +48,20 @@ def ensure_folder(path: str):
     if not os.path.isdir(path):
         os.makedirs(path, exist_ok=True)
 
-def clear_input_file(path: str):
-    """Truncate (empty) the file at `path`."""
-    with open(path, 'w', encoding='utf-8'):
-        pass  # opening in 'w' mode clears the file
-
-def read_raw_contents(path: str) -> str:
-    """
-    Return the entire contents of the file at `path` as a string.
-    If the file does not exist, returns an empty string.
-    """
-    if not os.path.isfile(path):
-        return ""
-    with open(path, 'r', encoding='utf-8') as f:
-        return f.read()
-
 # ─── WATCHER LOOP ──────────────────────────────────────────────────────────────
 
-def watch_loop():
+def watch_loop(stop_event=None, metrics_path=None, profile_path=None, **batch_options):
     """
-    Continuously watch data/raw/toSequence.txt. Whenever new non‐empty content appears,
-    run the batch parser and then clear toSequence.txt. Sleeps 1 second between checks.
+    Continuously watch data/raw/toSequence.txt. Whenever complete new lines are
+    appended, run the batch parser on just those lines. The file is followed by
+    byte offset (see utils.input_tailer): it is never re-read from the start or
+    truncated, and lines appended while a batch is parsing are picked up next.
+    `batch_options` (streaming, workers, columnar) are passed on to dna_ui.main();
+    streaming output is appended to across batches, and with workers > 1 one
+    process pool is kept for all batches. With `metrics_path`, the
+    Prometheus metrics file is rewritten after every batch; with
+    `profile_path`, cProfile stats accumulated over all batches are dumped
+    there after every batch.
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
@@ -76,46 +72,47 @@ def watch_loop():
     ensure_folder(output_folder)
 
     input_file = os.path.join(raw_folder, 'toSequence.txt')
-    last_content = ""
+    tailer = InputTailer(input_file)
+    profiler = RunProfiler(profile_path) if profile_path else None
+    # One pool for the watcher's lifetime: workers build their calculator once
+    workers = batch_options.get('workers', 1)
+    pool = worker_pool(workers, os.path.join(script_dir, 'rules')) if workers > 1 else None
 
     print("[Watcher] Started. Monitoring data/raw/toSequence.txt for new DNA lines…")
     try:
-        while True:
-            current_content = read_raw_contents(input_file)
-
-            # If there’s new non‐empty content that differs from last run, process it:
-            if current_content.strip() and current_content != last_content:
-                timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                print(f"[{timestamp}] New DNA detected → running parser…")
-
-                try:
-                    run_batch()
-                except Exception as e:
-                    print(f"[Watcher][ERROR] During parsing: {e}")
-
-                # Clear the input file so it won’t be parsed again
-                clear_input_file(input_file)
-                print(f"[{timestamp}] Parsing complete. Cleared toSequence.txt.\n")
-
-                # Reset last_content so we’ll catch the next chunk of DNA
-                last_content = ""
-            else:
-                # If the file is now empty, keep last_content = ""
-                if not current_content.strip():
-                    last_content = ""
-
-            time.sleep(1.0)
+        for lines in tailer.follow(stop_event):
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+            print(f"[{timestamp}] {len(lines)} new DNA line(s) → running parser…")
+
+            try:
+                if profiler is not None:
+                    with profiler:
+                        run_batch(dna_strings=lines, append=True, pool=pool, **batch_options)
+                else:
+                    run_batch(dna_strings=lines, append=True, pool=pool, **batch_options)
+            except Exception as e:
+                print(f"[Watcher][ERROR] During parsing: {e}")
+            if metrics_path:
+                METRICS.write_prometheus(metrics_path)
+
+            print(f"[{timestamp}] Parsing complete.\n")
 
     except KeyboardInterrupt:
         print("\n[Watcher] Interrupted by user. Exiting watcher.")
         return
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
 # ─── SINGLE‐RUN (NO GUI) MODE ──────────────────────────────────────────────────
 
-def process_once():
+def process_once(metrics_path=None, profile_path=None, **batch_options):
     """
     Run the batch parser exactly once (reads all lines from toSequence.txt,
     writes output JSON+CSV, then exits).
+    With `metrics_path` the Prometheus metrics file is written afterwards;
+    with `profile_path` the run is wrapped in cProfile and the stats dumped
+    there (the top functions are printed too).
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
@@ -132,11 +129,23 @@ def process_once():
 
     print("[Once‐Runner] Processing all DNA strings once…")
     try:
-        run_batch()
+        if profile_path:
+            with RunProfiler(profile_path, top=20):
+                run_batch(**batch_options)
+            print(f"[Once‐Runner] Profile → {profile_path}")
+        else:
+            run_batch(**batch_options)
         print("[Once‐Runner] Done.")
     except Exception as e:
         print(f"[Once‐Runner][ERROR] During parsing: {e}")
 
+    if METRICS.enabled:
+        for line in METRICS.summary():
+            print(f"[Once‐Runner] {line}")
+    if metrics_path:
+        METRICS.write_prometheus(metrics_path)
+        print(f"[Once‐Runner] Metrics → {metrics_path}")
+
 # ─── MAIN ENTRYPOINT ───────────────────────────────────────────────────────────
 
 def main():
@@ -151,15 +160,57 @@ def main():
         action="store_true",
         help="Run the DNA batch parser exactly once (no GUI, no watcher)."
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Constant-memory parsing: write NDJSON + schema-column CSV chunk by chunk "
+             "(watcher batches are appended)."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Parse in N worker processes (output keeps input order)."
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Write per-rule typed .npy columns + manifest instead of JSON/CSV."
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="Record stage timers, counters and latency histograms and write them to PATH "
+             "in Prometheus text format (after every batch when watching)."
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'output', 'sonicdna.prof'),
+        metavar="PATH",
+        help="Wrap parsing in cProfile and dump the stats to PATH "
+             "(default data/output/sonicdna.prof)."
+    )
     args = parser.parse_args()
+    if args.stream and args.columnar:
+        parser.error("--stream and --columnar are separate output formats; pick one.")
+    if args.columnar and args.workers > 1:
+        parser.error("--columnar parses in-process; --workers does not apply to it.")
+    batch_options = {'streaming': args.stream, 'workers': args.workers, 'columnar': args.columnar}
+    if args.metrics:
+        enable_metrics()
+        batch_options['metrics_path'] = os.path.abspath(args.metrics)
+    if args.profile:
+        batch_options['profile_path'] = os.path.abspath(args.profile)
 
     if args.once:
         # Run batch a single time, then exit
-        process_once()
+        process_once(**batch_options)
         return
 
     # Otherwise: start watcher, then launch GUI
-    watcher_thread = threading.Thread(target=watch_loop, daemon=True)
+    watcher_thread = threading.Thread(target=watch_loop, kwargs=batch_options, daemon=True)
     watcher_thread.start()
     print("[main.py] Watcher thread started in background.")
 
@@ -168,6 +219,9 @@ def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
 
+    from PySide6.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+
     app = QApplication(sys.argv)
     win = MainWindow()
     win.show()
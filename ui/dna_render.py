@@ -0,0 +1,208 @@
+"""
+dna_render.py
+
+DNA-to-audio renderer: turns a sequence of 0.25s windows of parsed DNA into a
+stereo float32 buffer. Each window is { variable_name: nested_values }, as
+returned by DNACalculator.parse_frame or Track.window_values; a rule missing
+from a window keeps its previous value (sustain), and DEFAULTS apply before a
+rule first appears.
+
+Rules used so far:
+
+  • Volume     amp (‰ gain) and lr (left dominance, equal-power pan)
+  • Frequency  root hz, micro ±cents, FM: index/100 = modulation index,
+               rate letter Z…A = modulator ratio 0.25×…8× (geometric),
+               links ‰ = how far that ratio is pulled to the nearest integer
+  • Envelope   ADSR per note; curve letters a (fastest) … f (slowest)
+
+A note is a run of windows with the same pitch and envelope. Release ends
+exactly at the note's end, so note boundaries meet at zero.
+
+All windows of a batch are rendered as one (windows, samples) array. Carrier
+and modulator start phases of every window come from a cumulative sum over the
+whole track, so phase is continuous across windows and batches, and any range
+of windows can be rendered on its own: render_windows(workers=N) splits long
+tracks into segments rendered in a process pool, with the same output.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.dna_calculator import class_codes
+from utils.dna_track import WINDOW_SECONDS
+from ui.oscillator import SAMPLE_RATE
+
+# Windows rendered per NumPy batch (bounds peak memory) and per pool task
+BATCH_WINDOWS = 240
+SEGMENT_WINDOWS = 480
+# Amplitude / modulation-index changes between windows are ramped this long
+RAMP_SECONDS = 0.005
+
+DEFAULTS = {
+    'Volume': {'amp': 1000, 'lr': 50},
+    'Frequency': {
+        'root': {'hz': 440},
+        'micro': {'sign': 'P', 'value': 0},
+        'fm': {'index': 0, 'rate': 'M', 'links': 0},
+    },
+    'Envelope': {
+        'attack': {'curve': 'c', 'time': 0},
+        'decay': {'curve': 'c', 'time': 0},
+        'sustain': {'level': 100},
+        'release': {'curve': 'c', 'time': 0},
+    },
+}
+
+# Segment shape exponent per curve letter: small exponents reach the target fast
+CURVE_EXPONENTS = {'a': 0.25, 'b': 0.5, 'c': 1.0, 'd': 1.5, 'e': 2.0, 'f': 3.0}
+# FM rate letters, slowest first
+FM_RATES = class_codes('Z-A')
+FM_RATIOS = dict(zip(FM_RATES, 0.25 * 32.0 ** (np.arange(len(FM_RATES)) / (len(FM_RATES) - 1))))
+
+# ─── Window parameters ────────────────────────────────────────────────────────
+
+def window_params(windows):
+    """
+    Flatten a window sequence into per-window parameter arrays (length W).
+    """
+    current = {name: values for name, values in DEFAULTS.items()}
+    rows = []
+    for window in windows:
+        for name in DEFAULTS:
+            if name in window:
+                current[name] = window[name]
+        vol, fre, env = current['Volume'], current['Frequency'], current['Envelope']
+        micro = fre['micro']['value'] * (1 if fre['micro']['sign'] == 'P' else -1)
+        rows.append((
+            vol['amp'] / 1000.0,
+            vol['lr'] / 100.0,
+            fre['root']['hz'] * 2.0 ** (micro / 1200.0),
+            fre['fm']['index'] / 100.0,
+            FM_RATIOS[fre['fm']['rate']],
+            fre['fm']['links'] / 1000.0,
+            env['attack']['time'] / 1000.0, CURVE_EXPONENTS[env['attack']['curve']],
+            env['decay']['time'] / 1000.0, CURVE_EXPONENTS[env['decay']['curve']],
+            env['sustain']['level'] / 100.0,
+            env['release']['time'] / 1000.0, CURVE_EXPONENTS[env['release']['curve']],
+        ))
+    names = ('amp', 'lr', 'hz', 'fm_index', 'fm_ratio', 'fm_links',
+             'attack', 'attack_curve', 'decay', 'decay_curve', 'sustain',
+             'release', 'release_curve')
+    table = np.array(rows, dtype=float).reshape(len(rows), len(names))
+    return {name: table[:, i] for i, name in enumerate(names)}
+
+def plan_track(params, sample_rate=SAMPLE_RATE):
+    """
+    Add the track-wide values every window needs to be rendered on its own:
+    carrier/modulator start phases, note position, and the previous window's
+    amp / FM index (for ramps).
+    """
+    plan = dict(params)
+    n = len(params['hz'])
+    samples = int(round(WINDOW_SECONDS * sample_rate))
+
+    ratio = params['fm_ratio']
+    locked = np.maximum(np.round(ratio), 1.0)
+    mod_hz = params['hz'] * (ratio + (locked - ratio) * params['fm_links'])
+    plan['mod_hz'] = mod_hz
+    for key, hz in (('carrier_phase', params['hz']), ('mod_phase', mod_hz)):
+        cycles = np.zeros(n)
+        np.cumsum(hz[:-1] * samples / sample_rate, out=cycles[1:])
+        plan[key] = cycles % 1.0
+
+    # Notes: runs of windows with the same pitch and envelope
+    note_keys = np.stack([params[k] for k in ('hz', 'attack', 'attack_curve', 'decay', 'decay_curve',
+                                             'sustain', 'release', 'release_curve')], axis=1)
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = (note_keys[1:] != note_keys[:-1]).any(axis=1)
+    note_id = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    length = np.diff(np.append(first, n))
+    plan['note_offset'] = (np.arange(n) - first[note_id]) * samples
+    plan['note_length'] = length[note_id] * samples
+
+    for key in ('amp', 'fm_index'):
+        prev = np.empty(n)
+        prev[:1] = params[key][:1]
+        prev[1:] = params[key][:-1]
+        plan[f'prev_{key}'] = prev
+    return plan
+
+# ─── Rendering ────────────────────────────────────────────────────────────────
+
+def _shape(x, exponent):
+    return np.clip(x, 0.0, 1.0) ** exponent
+
+def _envelope(p, t, length, sample_rate):
+    """
+    ADSR level at note-relative sample positions `t` (W, S) for notes of
+    `length` samples (W, 1); per-window parameters are (W, 1) columns.
+    A release longer than its note is cut to the note, so it fades the
+    note out from whatever level attack/decay have reached.
+    """
+    a = np.maximum(p['attack'] * sample_rate, 1.0)
+    d = np.maximum(p['decay'] * sample_rate, 1.0)
+    r = np.minimum(p['release'] * sample_rate, length)
+    gate = length - r
+
+    held = np.where(t < a, _shape(t / a, p['attack_curve']),
+                    1.0 + (p['sustain'] - 1.0) * _shape((t - a) / d, p['decay_curve']))
+    fade = 1.0 - _shape((t - gate) / np.maximum(r, 1.0), p['release_curve'])
+    return np.where(t >= gate, held * fade, held)
+
+def render_range(plan, start, stop, sample_rate=SAMPLE_RATE):
+    """
+    Render windows [start, stop) of a planned track; returns (samples, 2)
+    float32. Independent of every other range.
+    """
+    samples = int(round(WINDOW_SECONDS * sample_rate))
+    p = {k: v[start:stop, None] for k, v in plan.items()}
+    t = np.arange(samples, dtype=float)
+    seconds = t / sample_rate
+
+    ramp = np.minimum(t / max(RAMP_SECONDS * sample_rate, 1.0), 1.0)
+    amp = p['prev_amp'] + (p['amp'] - p['prev_amp']) * ramp
+    index = p['prev_fm_index'] + (p['fm_index'] - p['prev_fm_index']) * ramp
+
+    carrier = p['carrier_phase'] + p['hz'] * seconds
+    modulator = p['mod_phase'] + p['mod_hz'] * seconds
+    mono = np.sin(2 * np.pi * carrier + index * np.sin(2 * np.pi * modulator))
+    mono *= amp
+    mono *= _envelope(p, p['note_offset'] + t, p['note_length'], sample_rate)
+
+    out = np.empty((mono.size, 2), dtype=np.float32)
+    out[:, 0] = (mono * np.sqrt(p['lr'])).ravel()
+    out[:, 1] = (mono * np.sqrt(1.0 - p['lr'])).ravel()
+    return out
+
+def _render_segment(args):
+    plan, sample_rate, batch_windows = args
+    n = len(plan['hz'])
+    parts = [render_range(plan, i, min(i + batch_windows, n), sample_rate)
+             for i in range(0, n, batch_windows)]
+    return np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.float32)
+
+def render_windows(windows, sample_rate=SAMPLE_RATE, workers=1,
+                   batch_windows=BATCH_WINDOWS, segment_windows=SEGMENT_WINDOWS):
+    """
+    Render a sequence of parsed DNA windows to stereo float32 audio of shape
+    (len(windows) * samples_per_window, 2). With workers > 1, segments of
+    `segment_windows` windows are rendered in a process pool; the result is
+    the same as rendering in one process.
+    """
+    if not len(windows):
+        return np.zeros((0, 2), dtype=np.float32)
+    plan = plan_track(window_params(windows), sample_rate)
+    n = len(plan['hz'])
+    if workers <= 1 or n <= segment_windows:
+        return _render_segment((plan, sample_rate, batch_windows))
+    tasks = [({k: v[i:i + segment_windows] for k, v in plan.items()}, sample_rate, batch_windows)
+             for i in range(0, n, segment_windows)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(_render_segment, tasks)))
+
+def render_frames(calculator, frames, **options):
+    """
+    Parse window frames ("VOL…FRE…ENV…" strings) and render them.
+    """
+    return render_windows([calculator.parse_frame(frame) for frame in frames], **options)
@@ -5,7 +5,6 @@ from PySide6.QtWidgets import (
     QPushButton, QLabel, QFrame, QStackedWidget
 )
 from PySide6.QtCore import Qt
-from ui.music_panel import MusicPanel
 
 
 class MainWindow(QMainWindow):
@@ -68,6 +67,8 @@ class MainWindow(QMainWindow):
     def show_music_panel(self):
         print("Switching to MusicPanel")
         if self.music_panel is None:
+            # Imported on first use: pulls in numpy, scipy and sounddevice
+            from ui.music_panel import MusicPanel
             self.music_panel = MusicPanel()
             self.stacked.addWidget(self.music_panel)
         self.stacked.setCurrentWidget(self.music_panel)
@@ -1,5 +1,4 @@
 import numpy as np
-import sounddevice as sd
 from scipy.io.wavfile import write as write_wav
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
@@ -7,128 +6,9 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtGui import QPainter, QPen, QColor
 
-SAMPLE_RATE = 44100
-DURATION = 2.0
-FREQ = 440
-
-BASE_SOUNDS = [
-    "Sine Wave",
-    "Square Wave",
-    "Triangle Wave",
-    "Sawtooth Wave",
-    "Pulse Wave",
-    "Supersaw",
-    "Organ (Additive)",
-    "Ring Modulated",
-    "Impulse",
-    "Click",
-    "Burst",
-    "DC Offset",
-    "Silence",
-    "Sample & Hold",
-    "Stepped Random",
-    "Linear Chirp",
-    "White Noise",
-    "Pink Noise",
-    "Brown Noise",
-    "Blue Noise",
-    "Violet Noise",
-    "Grey Noise"
-]
-
-def gen_wave(wave_type, volume=0.8):
-    t = np.linspace(0, DURATION, int(SAMPLE_RATE * DURATION), endpoint=False)
-    if wave_type == "Sine Wave":
-        return volume * np.sin(2 * np.pi * FREQ * t)
-    elif wave_type == "Square Wave":
-        return volume * np.sign(np.sin(2 * np.pi * FREQ * t))
-    elif wave_type == "Triangle Wave":
-        return volume * (2 * np.abs(2 * ((t * FREQ) % 1) - 1) - 1)
-    elif wave_type == "Sawtooth Wave":
-        return volume * (2 * ((t * FREQ) % 1) - 1)
-    elif wave_type == "Pulse Wave":
-        pulse_width = 0.2
-        return volume * np.where((t * FREQ) % 1 < pulse_width, 1, -1)
-    elif wave_type == "Supersaw":
-        detune = [FREQ*0.98, FREQ*0.99, FREQ, FREQ*1.01, FREQ*1.02]
-        sum_saws = sum(np.sin(2 * np.pi * d * t) for d in detune)
-        return volume * (sum_saws / len(detune))
-    elif wave_type == "Organ (Additive)":
-        harmonics = [1, 2, 3, 4, 5]
-        amps = [1.0, 0.5, 0.25, 0.13, 0.06]
-        organ = sum(a * np.sin(2 * np.pi * FREQ * h * t) for a, h in zip(amps, harmonics))
-        return volume * (organ / sum(amps))
-    elif wave_type == "Ring Modulated":
-        mod_freq = 55
-        return volume * np.sin(2 * np.pi * FREQ * t) * np.sin(2 * np.pi * mod_freq * t)
-    elif wave_type == "Impulse":
-        data = np.zeros_like(t)
-        data[0] = 1
-        return volume * data
-    elif wave_type == "Click":
-        data = np.zeros_like(t)
-        data[:int(0.002 * SAMPLE_RATE)] = 1
-        return volume * data
-    elif wave_type == "Burst":
-        data = np.zeros_like(t)
-        burst_len = int(0.1 * SAMPLE_RATE)
-        data[:burst_len] = np.sin(2 * np.pi * FREQ * t[:burst_len])
-        return volume * data
-    elif wave_type == "DC Offset":
-        return volume * np.ones_like(t)
-    elif wave_type == "Silence":
-        return np.zeros_like(t)
-    elif wave_type == "Sample & Hold":
-        steps = 32
-        step_len = len(t) // steps
-        vals = np.random.uniform(-1, 1, steps)
-        data = np.repeat(vals, step_len)
-        data = np.pad(data, (0, len(t) - len(data)))
-        return volume * data
-    elif wave_type == "Stepped Random":
-        steps = 16
-        idx = np.floor(np.linspace(0, steps, len(t))).astype(int)
-        vals = np.random.uniform(-1, 1, steps+1)
-        return volume * vals[idx]
-    elif wave_type == "Linear Chirp":
-        f0, f1 = 220, 1760
-        chirp = np.sin(2 * np.pi * (f0 + (f1 - f0) * t / DURATION / 2) * t)
-        return volume * chirp
-    elif wave_type == "White Noise":
-        return volume * np.random.uniform(-1, 1, len(t))
-    elif wave_type == "Pink Noise":
-        nrows, ncols = 16, len(t)
-        array = np.random.randn(nrows, ncols)
-        array = np.cumsum(array, axis=0)
-        pink = array[-1] / np.max(np.abs(array[-1]))
-        return volume * pink
-    elif wave_type == "Brown Noise":
-        wn = np.random.uniform(-1, 1, len(t))
-        brown = np.cumsum(wn)
-        brown = brown / np.max(np.abs(brown))
-        return volume * brown
-    elif wave_type == "Blue Noise":
-        white = np.random.normal(0, 1, len(t))
-        fft = np.fft.rfft(white)
-        freqs = np.fft.rfftfreq(len(white), 1 / SAMPLE_RATE)
-        fft *= np.sqrt(freqs)
-        blue = np.fft.irfft(fft)
-        blue = blue / np.max(np.abs(blue))
-        return volume * blue
-    elif wave_type == "Violet Noise":
-        white = np.random.normal(0, 1, len(t))
-        fft = np.fft.rfft(white)
-        freqs = np.fft.rfftfreq(len(white), 1 / SAMPLE_RATE)
-        fft *= freqs
-        violet = np.fft.irfft(fft)
-        violet = violet / np.max(np.abs(violet))
-        return volume * violet
-    elif wave_type == "Grey Noise":
-        white = np.random.normal(0, 1, len(t))
-        eq_curve = np.linspace(0.6, 1.2, len(white))
-        return volume * (white * eq_curve / np.max(np.abs(white * eq_curve)))
-    else:
-        return np.zeros_like(t)
+# gen_wave is re-exported for existing `from ui.music_panel import gen_wave` users
+from ui.waves import SAMPLE_RATE, BASE_SOUNDS, WAVE_CACHE, gen_wave  # noqa: F401
+from ui.playback import PlaybackEngine
 
 class WaveformWidget(QWidget):
     def __init__(self):
@@ -184,6 +64,8 @@ class MusicPanel(QWidget):
         # State
         self.current_wave = None
         self.is_playing = False
+        # Streams blocks from a callback; the selected sound can change while playing
+        self.engine = PlaybackEngine()
 
         # Signals
         self.sound_selector.currentTextChanged.connect(self.update_waveform)
@@ -193,21 +75,21 @@ class MusicPanel(QWidget):
 
     def update_waveform(self):
         wave_type = self.sound_selector.currentText()
-        data = gen_wave(wave_type)
+        # Cached and read-only: re-selecting a sound reuses its buffer
+        data = WAVE_CACHE.get(wave_type)
         self.current_wave = data
         self.waveform.set_wave(data)
-        if self.is_playing:
-            self.toggle_play()  # Stop if user changes wave while playing
+        self.engine.set(wave_type=wave_type)  # heard within a block if playing
 
     def toggle_play(self):
         if not self.is_playing:
             self.is_playing = True
             self.play_btn.setText("Pause")
-            sd.play(self.current_wave, samplerate=SAMPLE_RATE)
+            self.engine.start()
         else:
             self.is_playing = False
             self.play_btn.setText("Play")
-            sd.stop()
+            self.engine.stop()
 
     def download_wave(self):
         if self.current_wave is not None:
@@ -0,0 +1,156 @@
+"""
+noise.py
+
+Block-streaming noise sources (NumPy only). Each source is an endless
+generator that yields float64 blocks of `block_size` samples and carries its
+filter state from block to block, so memory stays O(block) for renders of
+any length, including real-time playback:
+
+  • white   – uniform white noise
+  • pink    – Voss–McCartney: rows of held random values, row k redrawn
+              every 2**k samples, summed (-3 dB/octave)
+  • brown   – leaky integrator over white noise (-6 dB/octave)
+  • blue    – first difference of pink (+3 dB/octave)
+  • violet  – first difference of white (+6 dB/octave)
+
+Instead of normalizing by a whole-buffer maximum, every filtered source
+applies a fixed gain chosen for an RMS of NOISE_RMS (about what the old
+max-normalized buffers had) and clips the rare peaks to ±1.
+"""
+import numpy as np
+
+BLOCK_SIZE = 1024
+NOISE_RMS = 0.25
+PINK_ROWS = 16
+BROWN_LEAK = 0.995
+# The leaky integrator is evaluated in closed form over sub-blocks this long,
+# which keeps leak ** -LEAK_CHUNK small enough to stay exact
+LEAK_CHUNK = 256
+
+# Variance of uniform(-1, 1)
+_UNIFORM_VAR = 1.0 / 3.0
+
+def _emit(block, gain):
+    block *= gain
+    np.clip(block, -1.0, 1.0, out=block)
+    return block
+
+def _white_blocks(rng, block_size):
+    while True:
+        yield rng.uniform(-1.0, 1.0, block_size)
+
+def white_noise(seed=None, block_size=BLOCK_SIZE):
+    # Already bounded to ±1, so no gain (as before)
+    return _white_blocks(np.random.default_rng(seed), block_size)
+
+def _pink_blocks(rng, block_size, rows):
+    """
+    Unscaled Voss–McCartney pink noise. A global sample counter decides which
+    row is redrawn at each sample (the counter's trailing zero count), so the
+    row update pattern runs on seamlessly across blocks. Exactly one row
+    changes per sample, so the row sum is the previous sum plus a cumulative
+    sum of (new draw - that row's previous value).
+    """
+    held = rng.uniform(-1.0, 1.0, rows)
+    counter = 1
+    while True:
+        index = np.arange(counter, counter + block_size, dtype=np.int64)
+        counter += block_size
+        _, exponent = np.frexp((index & -index).astype(float))
+        row_of = np.minimum(exponent - 1, rows - 1)
+        draws = rng.uniform(-1.0, 1.0, block_size)
+        # Group the samples by row (in time order) to find each draw's predecessor
+        order = np.argsort(row_of, kind='stable')
+        grouped_rows = row_of[order]
+        grouped = draws[order]
+        first = np.ones(block_size, dtype=bool)
+        first[1:] = grouped_rows[1:] != grouped_rows[:-1]
+        previous = np.empty(block_size)
+        previous[1:] = grouped[:-1]
+        previous[first] = held[grouped_rows[first]]
+        delta = np.empty(block_size)
+        delta[order] = grouped - previous
+        block = held.sum() + np.cumsum(delta)
+        last = np.flatnonzero(np.append(first[1:], True))
+        held[grouped_rows[last]] = grouped[last]
+        block += rng.uniform(-1.0, 1.0, block_size)  # per-sample white term
+        yield block
+
+def pink_noise(seed=None, block_size=BLOCK_SIZE, rows=PINK_ROWS):
+    rng = np.random.default_rng(seed)
+    gain = NOISE_RMS / np.sqrt((rows + 1) * _UNIFORM_VAR)
+    for block in _pink_blocks(rng, block_size, rows):
+        yield _emit(block, gain)
+
+def _leaky_integrate(x, leak, state):
+    """
+    y[n] = leak * y[n-1] + x[n] over the block `x`, starting from y[-1] =
+    `state`. Returns (y, last_y).
+    """
+    y = np.empty_like(x)
+    powers = leak ** np.arange(1, LEAK_CHUNK + 1)
+    for start in range(0, len(x), LEAK_CHUNK):
+        chunk = x[start:start + LEAK_CHUNK]
+        p = powers[:len(chunk)]
+        out = p * (state + np.cumsum(chunk / p))
+        y[start:start + len(chunk)] = out
+        state = out[-1]
+    return y, state
+
+def brown_noise(seed=None, block_size=BLOCK_SIZE, leak=BROWN_LEAK):
+    rng = np.random.default_rng(seed)
+    # Stationary variance of the leaky integrator
+    gain = NOISE_RMS / np.sqrt(_UNIFORM_VAR / (1.0 - leak * leak))
+    # Start from the stationary distribution instead of silence
+    state = rng.normal(0.0, np.sqrt(_UNIFORM_VAR / (1.0 - leak * leak)))
+    for white in _white_blocks(rng, block_size):
+        block, state = _leaky_integrate(white, leak, state)
+        yield _emit(block, gain)
+
+def _differentiate(blocks):
+    """
+    First difference across a stream of blocks (carrying the last sample).
+    """
+    previous = 0.0
+    for block in blocks:
+        out = np.empty_like(block)
+        out[0] = block[0] - previous
+        np.subtract(block[1:], block[:-1], out=out[1:])
+        previous = block[-1]
+        yield out
+
+# Variance of the first difference of unscaled pink noise with PINK_ROWS rows:
+# each step redraws the white term plus one row (two independent draws)
+_BLUE_VAR = 2 * 2 * _UNIFORM_VAR
+
+def blue_noise(seed=None, block_size=BLOCK_SIZE, rows=PINK_ROWS):
+    rng = np.random.default_rng(seed)
+    gain = NOISE_RMS / np.sqrt(_BLUE_VAR)
+    for block in _differentiate(_pink_blocks(rng, block_size, rows)):
+        yield _emit(block, gain)
+
+def violet_noise(seed=None, block_size=BLOCK_SIZE):
+    rng = np.random.default_rng(seed)
+    gain = NOISE_RMS / np.sqrt(2 * _UNIFORM_VAR)
+    for block in _differentiate(_white_blocks(rng, block_size)):
+        yield _emit(block, gain)
+
+NOISE_SOURCES = {
+    "White Noise": white_noise,
+    "Pink Noise": pink_noise,
+    "Brown Noise": brown_noise,
+    "Blue Noise": blue_noise,
+    "Violet Noise": violet_noise,
+}
+
+def render_noise(wave_type, n, seed=None, block_size=BLOCK_SIZE):
+    """
+    The first `n` samples of a NOISE_SOURCES stream, written block by block
+    into one output array.
+    """
+    out = np.empty(n)
+    source = NOISE_SOURCES[wave_type](seed, block_size)
+    for start in range(0, n, block_size):
+        block = next(source)
+        out[start:start + block_size] = block[:n - start]
+    return out
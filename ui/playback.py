@@ -0,0 +1,283 @@
+"""
+playback.py
+
+Streaming playback for the music panel. A producer thread renders fixed-size
+blocks for the current parameters (wave type, volume, frequency) into a
+single-producer/single-consumer ring; the audio callback of a
+sounddevice.OutputStream copies one block out per call. Parameters change on
+the fly: blocks rendered with old parameters are skipped by the callback as
+soon as a newer block is queued, so a change is heard within about one block
+and the stream never restarts.
+
+Without an audio device (tests, CI) the engine runs on NullOutputStream, or
+fully synchronously via render_offline().
+"""
+import threading
+import time
+
+import numpy as np
+
+from ui.noise import NOISE_SOURCES
+from ui.oscillator import SAMPLE_RATE, Oscillator
+from ui.waves import DURATION, FREQ, OSCILLATOR_SHAPES, WAVE_CACHE
+
+BLOCK_SIZE = 256
+RING_BLOCKS = 4
+SUPERSAW_DETUNE = (0.98, 0.99, 1.0, 1.01, 1.02)
+RING_MOD_FREQ = 55
+
+class BlockRing:
+    """
+    Lock-free single-producer/single-consumer ring of float32 blocks. The
+    producer only advances `_write` and the consumer only `_read` (both
+    ever-increasing counters), so under the GIL neither side needs a lock.
+    Each block is tagged with the parameter generation it was rendered for.
+    """
+
+    def __init__(self, blocks=RING_BLOCKS, block_size=BLOCK_SIZE):
+        self.blocks = blocks
+        self.block_size = block_size
+        self._data = np.zeros((blocks, block_size), dtype=np.float32)
+        self._generation = np.zeros(blocks, dtype=np.int64)
+        self._write = 0
+        self._read = 0
+
+    def available(self):
+        return self._write - self._read
+
+    def free(self):
+        return self.blocks - (self._write - self._read)
+
+    def push(self, block, generation):
+        """
+        Queue one block; returns False (dropping nothing) if the ring is full.
+        """
+        if self._write - self._read >= self.blocks:
+            return False
+        slot = self._write % self.blocks
+        self._data[slot] = block
+        self._generation[slot] = generation
+        self._write += 1
+        return True
+
+    def pop_into(self, out, generation=0):
+        """
+        Copy the next block into `out`. Queued blocks older than `generation`
+        are skipped while a newer one is behind them. On underrun `out` is
+        zero-filled and False is returned.
+        """
+        while (self._write - self._read > 1
+               and self._generation[self._read % self.blocks] < generation):
+            self._read += 1
+        if self._write == self._read:
+            out.fill(0)
+            return False
+        out[:] = self._data[self._read % self.blocks]
+        self._read += 1
+        return True
+
+class BlockSource:
+    """
+    Renders consecutive blocks of one sound with state carried across blocks:
+    oscillator phase, noise filter state, or the read position in a looped
+    buffer for the one-shot types. Changing the frequency keeps the phase, so
+    retuning does not click; volume changes are ramped over one block.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self._key = None
+        self._volume = None
+
+    def _reset(self, wave_type, seed):
+        self._voices = []
+        self._noise = None
+        self._buffer = None
+        self._position = 0
+        if wave_type in OSCILLATOR_SHAPES:
+            self._voices = [(Oscillator(OSCILLATOR_SHAPES[wave_type], self.sample_rate), 1.0)]
+        elif wave_type == "Supersaw":
+            self._voices = [(Oscillator('sine', self.sample_rate), d) for d in SUPERSAW_DETUNE]
+        elif wave_type == "Ring Modulated":
+            self._ring = Oscillator('sine', self.sample_rate)
+            self._voices = [(Oscillator('sine', self.sample_rate), 1.0)]
+        elif wave_type in NOISE_SOURCES:
+            self._noise = NOISE_SOURCES[wave_type](seed, self.block_size)
+
+    def render(self, wave_type, volume=0.8, freq=FREQ, seed=None):
+        if self._key is None or self._key[0] != wave_type or self._key[2] != seed:
+            self._reset(wave_type, seed)
+        elif self._key[1] != freq and self._buffer is not None:
+            self._buffer = None  # looped one-shots are re-fetched at the new pitch
+        self._key = (wave_type, freq, seed)
+        n = self.block_size
+
+        if self._voices:
+            block = sum(osc.render(freq * detune, n) for osc, detune in self._voices)
+            block /= len(self._voices)
+            if wave_type == "Ring Modulated":
+                block *= self._ring.render(RING_MOD_FREQ, n)
+        elif self._noise is not None:
+            block = next(self._noise).copy()
+        else:
+            if self._buffer is None:
+                self._buffer = WAVE_CACHE.get(wave_type, 1.0, freq, DURATION, self.sample_rate, seed)
+            idx = (self._position + np.arange(n)) % len(self._buffer)
+            block = self._buffer[idx]
+            self._position = (self._position + n) % len(self._buffer)
+
+        start = volume if self._volume is None else self._volume
+        self._volume = volume
+        if start != volume:
+            block = block * np.linspace(start, volume, n, endpoint=False)
+        else:
+            block = block * volume
+        return block
+
+class NullOutputStream:
+    """
+    Stand-in for sounddevice.OutputStream without an audio device: a thread
+    calls `callback` once per block (at real-time pace if `realtime`) and
+    keeps the last `keep_blocks` output blocks in `captured`.
+    """
+
+    def __init__(self, samplerate, blocksize, callback, realtime=True, keep_blocks=None, **_):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.realtime = realtime
+        self.keep_blocks = keep_blocks
+        self.captured = []
+        self.active = False
+        self._thread = None
+
+    def start(self):
+        self.active = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        period = self.blocksize / self.samplerate
+        deadline = time.perf_counter()
+        while self.active:
+            out = np.zeros((self.blocksize, 1), dtype=np.float32)
+            self.callback(out, self.blocksize, None, None)
+            self.captured.append(out[:, 0])
+            if self.keep_blocks is not None and len(self.captured) > self.keep_blocks:
+                del self.captured[0]
+            if self.realtime:
+                deadline += period
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    def stop(self):
+        self.active = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+class PlaybackEngine:
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE, ring_blocks=RING_BLOCKS,
+                 null_device=False, device=None):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.null_device = null_device
+        self.device = device
+        self.ring = BlockRing(ring_blocks, block_size)
+        self.source = BlockSource(sample_rate, block_size)
+        self.params = {'wave_type': "Sine Wave", 'volume': 0.8, 'freq': FREQ, 'seed': None}
+        self.generation = 0
+        self.underruns = 0
+        self.stream = None
+        self._wake = threading.Event()
+        self._running = False
+        self._producer = None
+
+    # ─── Parameters ────────────────────────────────────────────────────────
+
+    def set(self, **params):
+        """
+        Change wave_type / volume / freq / seed while playing. The parameter
+        dict is replaced in one assignment, so the producer always sees a
+        consistent set.
+        """
+        unknown = set(params) - set(self.params)
+        if unknown:
+            raise ValueError(f"Unknown playback parameters: {sorted(unknown)}")
+        self.params = dict(self.params, **params)
+        self.generation += 1
+        self._wake.set()
+
+    # ─── Producer / consumer ───────────────────────────────────────────────
+
+    def _produce(self):
+        """
+        Fill the ring with blocks for the current parameters.
+        """
+        while self.ring.free() > 0:
+            generation = self.generation
+            block = self.source.render(**self.params)
+            self.ring.push(block, generation)
+
+    def _run_producer(self):
+        period = self.block_size / self.sample_rate
+        while self._running:
+            self._wake.clear()
+            self._produce()
+            self._wake.wait(period / 2)
+
+    def _callback(self, outdata, frames, time_info, status):
+        if frames != self.block_size:
+            outdata.fill(0)
+            self.underruns += 1
+            return
+        if not self.ring.pop_into(outdata[:, 0], self.generation):
+            self.underruns += 1
+
+    # ─── Lifecycle ─────────────────────────────────────────────────────────
+
+    @property
+    def playing(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._produce()  # first blocks are ready before the stream asks
+        self._running = True
+        self._producer = threading.Thread(target=self._run_producer, daemon=True)
+        self._producer.start()
+        if self.null_device:
+            self.stream = NullOutputStream(self.sample_rate, self.block_size, self._callback,
+                                           keep_blocks=RING_BLOCKS * 64)
+        else:
+            import sounddevice as sd
+            self.stream = sd.OutputStream(samplerate=self.sample_rate, blocksize=self.block_size,
+                                          channels=1, dtype='float32', latency='low',
+                                          device=self.device, callback=self._callback)
+        self.stream.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._wake.set()
+        self._producer.join()
+        self._producer = None
+        # The closed stream is kept so a NullOutputStream's capture stays readable
+        self.stream.stop()
+        self.stream.close()
+
+    def render_offline(self, blocks):
+        """
+        Run producer and callback in lockstep on this thread (no device, no
+        threads) and return `blocks` blocks of output; for tests and export.
+        """
+        out = np.zeros((blocks * self.block_size, 1), dtype=np.float32)
+        for i in range(blocks):
+            self._produce()
+            self._callback(out[i * self.block_size:(i + 1) * self.block_size], self.block_size, None, None)
+        return out[:, 0]
@@ -0,0 +1,194 @@
+"""
+waves.py
+
+Base-sound generation for the music panel (NumPy only, no GUI or audio
+device imports; periodic shapes come from the band-limited wavetable
+oscillators in ui.oscillator, colored noise from the block-streaming
+sources in ui.noise), plus a bounded cache of generated buffers
+so switching between sounds and re-previewing does not regenerate them.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ui.noise import NOISE_SOURCES, render_noise
+from ui.oscillator import SAMPLE_RATE, Oscillator, render, render_voices
+
+DURATION = 2.0
+FREQ = 440
+
+BASE_SOUNDS = [
+    "Sine Wave",
+    "Square Wave",
+    "Triangle Wave",
+    "Sawtooth Wave",
+    "Pulse Wave",
+    "Supersaw",
+    "Organ (Additive)",
+    "Ring Modulated",
+    "Impulse",
+    "Click",
+    "Burst",
+    "DC Offset",
+    "Silence",
+    "Sample & Hold",
+    "Stepped Random",
+    "Linear Chirp",
+    "White Noise",
+    "Pink Noise",
+    "Brown Noise",
+    "Blue Noise",
+    "Violet Noise",
+    "Grey Noise"
+]
+
+# Wave types rendered by a single wavetable oscillator
+OSCILLATOR_SHAPES = {
+    "Sine Wave": 'sine',
+    "Square Wave": 'square',
+    "Triangle Wave": 'triangle',
+    "Sawtooth Wave": 'sawtooth',
+    "Pulse Wave": 'pulse',
+    "Organ (Additive)": 'organ',
+}
+
+def gen_wave(wave_type, volume=0.8, freq=FREQ, duration=DURATION, sample_rate=SAMPLE_RATE, seed=None):
+    """
+    Generate `duration` seconds of `wave_type` at `freq` Hz. Random and noise
+    types draw from np.random.default_rng(seed), so a fixed seed gives the
+    same buffer every time.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
+    if wave_type in OSCILLATOR_SHAPES:
+        # Band-limited wavetable voice (see ui.oscillator)
+        return volume * render(OSCILLATOR_SHAPES[wave_type], freq, duration, sample_rate)
+    elif wave_type == "Supersaw":
+        detune = [freq*0.98, freq*0.99, freq, freq*1.01, freq*1.02]
+        return volume * render_voices('sine', detune, duration, sample_rate, mix=True) / len(detune)
+    elif wave_type == "Ring Modulated":
+        mod_freq = 55
+        return (volume * render('sine', freq, duration, sample_rate)
+                * render('sine', mod_freq, duration, sample_rate))
+    elif wave_type == "Impulse":
+        data = np.zeros_like(t)
+        data[0] = 1
+        return volume * data
+    elif wave_type == "Click":
+        data = np.zeros_like(t)
+        data[:int(0.002 * sample_rate)] = 1
+        return volume * data
+    elif wave_type == "Burst":
+        data = np.zeros_like(t)
+        burst_len = min(int(0.1 * sample_rate), len(t))
+        data[:burst_len] = Oscillator('sine', sample_rate).render(freq, burst_len)
+        return volume * data
+    elif wave_type == "DC Offset":
+        return volume * np.ones_like(t)
+    elif wave_type == "Silence":
+        return np.zeros_like(t)
+    elif wave_type == "Sample & Hold":
+        steps = 32
+        step_len = len(t) // steps
+        vals = rng.uniform(-1, 1, steps)
+        data = np.repeat(vals, step_len)
+        data = np.pad(data, (0, len(t) - len(data)))
+        return volume * data
+    elif wave_type == "Stepped Random":
+        steps = 16
+        idx = np.floor(np.linspace(0, steps, len(t))).astype(int)
+        vals = rng.uniform(-1, 1, steps+1)
+        return volume * vals[idx]
+    elif wave_type == "Linear Chirp":
+        f0, f1 = 220, 1760
+        # Instantaneous frequency sweeps linearly from f0 to f1
+        chirp = render('sine', f0 + (f1 - f0) * t / duration, duration, sample_rate)
+        return volume * chirp
+    elif wave_type in NOISE_SOURCES:
+        # Block-streamed with carried filter state (see ui.noise)
+        return volume * render_noise(wave_type, len(t), seed)
+    elif wave_type == "Grey Noise":
+        white = rng.normal(0, 1, len(t))
+        eq_curve = np.linspace(0.6, 1.2, len(white))
+        return volume * (white * eq_curve / np.max(np.abs(white * eq_curve)))
+    else:
+        return np.zeros_like(t)
+
+# Types whose output comes from the random generator; they are cached per seed
+NOISE_TYPES = frozenset([
+    "Sample & Hold",
+    "Stepped Random",
+    "White Noise",
+    "Pink Noise",
+    "Brown Noise",
+    "Blue Noise",
+    "Violet Noise",
+    "Grey Noise",
+])
+# Seed used for noise types when none is given, so a re-preview hits the cache
+DEFAULT_NOISE_SEED = 0
+# Default byte budget: ~45 two-second float64 buffers
+WAVE_CACHE_BYTES = 32 << 20
+
+class WaveCache:
+    """
+    LRU cache of generated buffers keyed by (wave type, volume, frequency,
+    duration, sample rate, seed), bounded by total array bytes. Cached
+    buffers are read-only; copy one before modifying it. Safe to share
+    between the GUI and the playback producer thread: buffers are generated
+    outside the lock, and a buffer another thread inserted first wins.
+    """
+
+    def __init__(self, max_bytes=WAVE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, wave_type, volume=0.8, freq=FREQ, duration=DURATION,
+            sample_rate=SAMPLE_RATE, seed=None):
+        """
+        Return the buffer gen_wave would produce for these parameters.
+        Noise types without a seed use DEFAULT_NOISE_SEED; deterministic
+        types ignore the seed.
+        """
+        if wave_type in NOISE_TYPES:
+            seed = DEFAULT_NOISE_SEED if seed is None else seed
+        else:
+            seed = None
+        key = (wave_type, float(volume), float(freq), float(duration), int(sample_rate), seed)
+        with self._lock:
+            data = self._buffers.get(key)
+            if data is not None:
+                self._buffers.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = gen_wave(wave_type, volume, freq, duration, sample_rate, seed)
+        data.flags.writeable = False
+        if data.nbytes > self.max_bytes:
+            return data
+        with self._lock:
+            cached = self._buffers.get(key)
+            if cached is not None:
+                self._buffers.move_to_end(key)
+                return cached
+            self._buffers[key] = data
+            self.nbytes += data.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._buffers.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._buffers)
+
+WAVE_CACHE = WaveCache()
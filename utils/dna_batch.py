@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Columnar (NumPy) batch decoding of DNA strings.
+
+Every rule is fixed-width, so a group of same-rule strings can be viewed as a
+2D array of code points and each compiled Field decoded for all rows at once.
+`DNACalculator.parse_batch` is the usual entry point.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from utils.dna_calculator import INT, RuleParseError
+
+# Decoded strings of one rule: `index` holds the positions of the rows in the
+# original input, `records` the structured array of fields and `ok` a bool
+# mask of rows that were well-formed (right length, prefix and digits).
+RuleBatch = namedtuple('RuleBatch', ['rule', 'index', 'records', 'ok'])
+
+_ZERO = ord('0')
+
+def column_name(field):
+    """
+    Column name of a compiled Field: its dotted path, e.g. 'root.hz'.
+    """
+    return '.'.join(field.path)
+
+def int_dtype(width):
+    """
+    Smallest unsigned integer dtype that holds any `width`-digit number.
+    """
+    bound = 10 ** width - 1
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if bound <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise ValueError(f"No integer dtype holds {width} digits")
+
+def field_dtype(field):
+    if field.kind == INT:
+        return int_dtype(field.width)
+    return np.dtype(f'U{field.width}')
+
+def record_dtype(rule):
+    """
+    Structured dtype with one column per compiled field of `rule`.
+    """
+    return np.dtype([(column_name(f), field_dtype(f)) for f in rule.fields])
+
+def as_code_matrix(strings, min_width=0, max_width=None):
+    """
+    Return (codes, lengths): an (n, width) uint32 array of Unicode code points
+    (zero-filled past each string's end) and each string's length. With
+    `max_width`, longer strings are cut to that many columns (so one junk
+    line cannot blow up the whole matrix); `lengths` stays their full length.
+    """
+    strings = list(strings)
+    if max_width is None:
+        arr = np.asarray(strings, dtype=str)
+    else:
+        arr = np.asarray(strings, dtype=f'U{max(max_width, 1)}')
+    if arr.ndim != 1:
+        arr = arr.ravel()
+    width = arr.dtype.itemsize // 4
+    codes = arr.view(np.uint32).reshape(len(arr), width)
+    if width < min_width:
+        codes = np.pad(codes, ((0, 0), (0, min_width - width)))
+    lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    return codes, lengths
+
+def decode_rule(rule, codes, lengths):
+    """
+    Decode rows of `codes` that all belong to `rule`.
+    Returns (records, ok). Fields of rows that are not ok hold zeros or junk.
+    """
+    n = len(codes)
+    if codes.shape[1] < rule.width:
+        codes = np.pad(codes, ((0, 0), (0, rule.width - codes.shape[1])))
+    records = np.zeros(n, dtype=record_dtype(rule))
+    prefix = np.array([ord(c) for c in rule.prefix], dtype=np.uint32)
+    ok = (lengths == rule.width) & (codes[:, :len(prefix)] == prefix).all(axis=1)
+    for field in rule.fields:
+        block = codes[:, field.offset:field.offset + field.width]
+        name = column_name(field)
+        if field.kind == INT:
+            digits = block.astype(np.int64) - _ZERO
+            is_digit = (digits >= 0) & (digits <= 9)
+            ok &= is_digit.all(axis=1)
+            digits[~is_digit] = 0
+            powers = 10 ** np.arange(field.width - 1, -1, -1, dtype=np.int64)
+            records[name] = digits @ powers
+        else:
+            records[name] = np.ascontiguousarray(block).view(f'U{field.width}').ravel()
+    return records, ok
+
+def parse_batch(calculator, strings):
+    """
+    Group `strings` by rule prefix and decode each group column-wise.
+    Returns { variable_name: RuleBatch }. Positions of strings that match no
+    rule are returned as an index array under the None key (only if any).
+    """
+    strings = list(strings)
+    n = len(strings)
+    prefix_len = calculator._prefix_len
+    # Anything longer than the widest rule is malformed anyway; its columns
+    # past that width are never read
+    max_width = max((rule.width for rule in calculator.rules.values()), default=0) + 1
+    codes, lengths = as_code_matrix(strings, min_width=prefix_len or 0, max_width=max_width)
+
+    groups = {}
+    matched = np.zeros(n, dtype=bool)
+    if prefix_len:
+        keys = np.ascontiguousarray(codes[:, :prefix_len]).view(f'U{prefix_len}').ravel()
+        for prefix, rule in calculator.rules.items():
+            index = np.flatnonzero(keys == prefix)
+            if len(index):
+                groups[rule.prefix] = index
+                matched[index] = True
+    else:
+        buckets = {}
+        for i, s in enumerate(strings):
+            rule = calculator.match(s)
+            if rule is not None:
+                buckets.setdefault(rule.prefix, []).append(i)
+        for prefix, positions in buckets.items():
+            groups[prefix] = np.array(positions, dtype=np.intp)
+            matched[groups[prefix]] = True
+
+    result = {}
+    for prefix, index in groups.items():
+        rule = calculator.rules[prefix]
+        records, ok = decode_rule(rule, codes[index], lengths[index])
+        result[rule.variable] = RuleBatch(rule, index, records, ok)
+    if not matched.all():
+        result[None] = np.flatnonzero(~matched)
+    return result
+
+# ─── Serializing ──────────────────────────────────────────────────────────────
+
+def _get_column(rule, columns, field):
+    """
+    Look a field's column up by its column name ('root.hz') or its flattened
+    name ('Frequency.root.hz'); `columns` is a mapping or structured array.
+    """
+    name = column_name(field)
+    names = columns.dtype.names if isinstance(columns, np.ndarray) else columns
+    for key in (name, f"{rule.variable}.{name}"):
+        if key in names:
+            return columns[key]
+    raise RuleParseError(f"Missing subvar '{name}' for rule '{rule.variable}'")
+
+def serialize_columns(rule, columns, as_bytes=False):
+    """
+    Vectorized Rule.serialize: build every DNA string of `rule` from one
+    column per field at once. `columns` maps column names (or flattened
+    names, as flatten_parsed produces) to arrays, or is a structured array
+    such as parse_batch / sample records. Scalars are broadcast to the
+    other columns' length.
+    Returns a list of str, or with `as_bytes` an array of fixed-width
+    bytes (dtype S<width>) that can be written out directly.
+    """
+    arrays = [np.asarray(_get_column(rule, columns, f)) for f in rule.fields]
+    n = max((len(a) for a in arrays if a.ndim), default=1)
+    codes = np.empty((n, rule.width), dtype=np.uint32)
+    codes[:, :len(rule.prefix)] = [ord(c) for c in rule.prefix]
+    for field, column in zip(rule.fields, arrays):
+        path = '.'.join(field.path)
+        column = np.broadcast_to(column, (n,))
+        block = codes[:, field.offset:field.offset + field.width]
+        if field.kind == INT:
+            if column.dtype.kind not in 'iu':
+                raise RuleParseError(f"Expected int for numeric field '{path}', got {column.dtype}")
+            bad = (column < 0) | (column >= 10 ** field.width)
+            if bad.any():
+                raise RuleParseError(
+                    f"Field '{path}' needs {field.width} digits, got {column[bad][0]}"
+                )
+            powers = 10 ** np.arange(field.width - 1, -1, -1, dtype=np.uint64)
+            block[:] = column.astype(np.uint64)[:, None] // powers % 10 + _ZERO
+        else:
+            if column.dtype.kind not in 'US':
+                raise RuleParseError(f"Expected str for class field '{path}', got {column.dtype}")
+            bad = np.char.str_len(column) != field.width
+            if bad.any():
+                raise RuleParseError(
+                    f"Field '{path}' needs {field.width} characters, got '{column[bad][0]}'"
+                )
+            text = np.ascontiguousarray(column, dtype=f'U{field.width}')
+            block[:] = text.view(np.uint32).reshape(n, field.width)
+    if as_bytes:
+        if (codes > 127).any():
+            raise RuleParseError(f"Non-ASCII characters in rule '{rule.variable}' values")
+        return codes.astype(np.uint8).view(f'S{rule.width}').ravel()
+    return codes.view(f'U{rule.width}').ravel().tolist()
+
+# ─── Sampling ─────────────────────────────────────────────────────────────────
+
+def sample_records(rule, n, seed=None):
+    """
+    Draw `n` random valid records for `rule`: every INT field uniform in its
+    [min, max] and every CLASS field uniform over its codes. Returns a
+    structured array with record_dtype(rule), like parse_batch's records.
+    `seed` is anything np.random.default_rng accepts.
+    """
+    rng = np.random.default_rng(seed)
+    records = np.zeros(n, dtype=record_dtype(rule))
+    for field in rule.fields:
+        name = column_name(field)
+        if field.kind == INT:
+            lo, hi = field.domain
+            hi = 10 ** field.width - 1 if hi is None else hi
+            records[name] = rng.integers(lo, hi, size=n, endpoint=True)
+        else:
+            codes = np.array(field.domain, dtype=f'U{field.width}')
+            records[name] = codes[rng.integers(0, len(codes), size=n)]
+    return records
+
+def sample(rule, n, seed=None, columns=False):
+    """
+    `n` random valid DNA strings for `rule` (a list of str), or with
+    `columns` the structured records they were rendered from.
+    """
+    records = sample_records(rule, n, seed)
+    if columns:
+        return records
+    return serialize_columns(rule, records)
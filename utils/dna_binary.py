@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Bit-packed binary storage for DNA windows.
+
+Each rule's min/max and class ranges give the minimal number of bits per field:
+numeric fields store (value - min), class fields store the code's position in
+the class order. A window becomes one fixed-size, MSB-first record, and a file
+holds records of a single rule behind a self-describing header:
+
+    b'SDNA' | uint16 version | uint32 header length | JSON header | records
+
+The header carries the whole layout, so files decode without the rules folder.
+"""
+import json
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from utils.dna_calculator import INT, RuleParseError
+from utils.dna_batch import column_name, int_dtype
+
+MAGIC = b'SDNA'
+VERSION = 1
+_PREAMBLE = struct.Struct('<4sHI')
+
+# One packed field: `width` is its DNA width in characters, `bits` its packed
+# width, `lo` the numeric minimum (INT) and `codes` the class order (CLASS).
+BitField = namedtuple('BitField', ['name', 'path', 'kind', 'width', 'bits', 'lo', 'codes'])
+
+class RecordLayout:
+    def __init__(self, variable, prefix, fields):
+        self.variable = variable
+        self.prefix = prefix
+        self.fields = tuple(fields)
+        self.bits = sum(f.bits for f in self.fields)
+        self.record_size = max(1, (self.bits + 7) // 8)
+        self._code_index = {
+            f.name: {code: i for i, code in enumerate(f.codes)}
+            for f in self.fields if f.kind != INT
+        }
+
+    @classmethod
+    def from_rule(cls, rule):
+        """
+        Derive the packed layout from a compiled Rule's field table.
+        """
+        fields = []
+        for f in rule.fields:
+            if f.kind == INT:
+                lo, hi = f.domain
+                if hi is None:
+                    hi = 10 ** f.width - 1
+                fields.append(BitField(column_name(f), f.path, f.kind, f.width,
+                                       (hi - lo).bit_length(), lo, None))
+            else:
+                fields.append(BitField(column_name(f), f.path, f.kind, f.width,
+                                       (len(f.domain) - 1).bit_length(), None, f.domain))
+        return cls(rule.variable, rule.prefix, fields)
+
+    @classmethod
+    def from_header(cls, header):
+        fields = [
+            BitField(f['name'], tuple(f['path']), f['kind'], f['width'], f['bits'],
+                     f.get('min'), tuple(f['codes']) if 'codes' in f else None)
+            for f in header['fields']
+        ]
+        layout = cls(header['variable'], header['prefix'], fields)
+        if layout.record_size != header['record_size']:
+            raise RuleParseError(
+                f"Header record size {header['record_size']} does not match its fields ({layout.record_size})"
+            )
+        return layout
+
+    def header(self):
+        fields = []
+        for f in self.fields:
+            entry = {'name': f.name, 'path': list(f.path), 'kind': f.kind,
+                     'width': f.width, 'bits': f.bits}
+            if f.kind == INT:
+                entry['min'] = f.lo
+            else:
+                entry['codes'] = list(f.codes)
+            fields.append(entry)
+        return {'variable': self.variable, 'prefix': self.prefix,
+                'record_size': self.record_size, 'fields': fields}
+
+    def record_dtype(self):
+        """
+        Structured dtype of unpacked records (same columns as dna_batch).
+        """
+        return np.dtype([
+            (f.name, int_dtype(f.width) if f.kind == INT else f'U{f.width}')
+            for f in self.fields
+        ])
+
+    # ─── Single records ────────────────────────────────────────────────────
+
+    def _code(self, field, value):
+        if field.kind == INT:
+            code = value - field.lo if isinstance(value, int) else -1
+            if code < 0 or code.bit_length() > field.bits:
+                raise RuleParseError(f"Value {value!r} out of range for '{field.name}' in {self.variable}")
+            return code
+        code = self._code_index[field.name].get(value)
+        if code is None:
+            raise RuleParseError(f"Unknown class {value!r} for '{field.name}' in {self.variable}")
+        return code
+
+    def pack(self, values_dict):
+        """
+        Pack one nested values dict (as returned by Rule.parse) into bytes.
+        """
+        acc = 0
+        for field in self.fields:
+            value = values_dict
+            for key in field.path:
+                if not isinstance(value, dict) or key not in value:
+                    raise RuleParseError(f"Missing subvar '{field.name}' for rule '{self.variable}'")
+                value = value[key]
+            acc = (acc << field.bits) | self._code(field, value)
+        acc <<= self.record_size * 8 - self.bits
+        return acc.to_bytes(self.record_size, 'big')
+
+    def unpack(self, record):
+        """
+        Unpack one record back into the nested values dict.
+        """
+        if len(record) != self.record_size:
+            raise RuleParseError(f"Expected {self.record_size}-byte record, got {len(record)}")
+        acc = int.from_bytes(record, 'big') >> (self.record_size * 8 - self.bits)
+        flat = []
+        for field in reversed(self.fields):
+            code = acc & ((1 << field.bits) - 1)
+            acc >>= field.bits
+            if field.kind == INT:
+                flat.append(field.lo + code)
+            else:
+                if code >= len(field.codes):
+                    raise RuleParseError(f"Class index {code} out of range for '{field.name}'")
+                flat.append(field.codes[code])
+        values = {}
+        for field, value in zip(self.fields, reversed(flat)):
+            node = values
+            for key in field.path[:-1]:
+                node = node.setdefault(key, {})
+            node[field.path[-1]] = value
+        return values
+
+    # ─── Vectorized ────────────────────────────────────────────────────────
+
+    def pack_records(self, records):
+        """
+        Pack a structured array (e.g. RuleBatch.records) into an
+        (n, record_size) uint8 array.
+        """
+        n = len(records)
+        bits = np.empty((n, self.bits), dtype=np.uint8)
+        col = 0
+        for field in self.fields:
+            column = records[field.name]
+            if field.kind == INT:
+                codes = column.astype(np.int64) - field.lo
+                if n and (codes.min() < 0 or int(codes.max()).bit_length() > field.bits):
+                    raise RuleParseError(f"Values out of range for '{field.name}' in {self.variable}")
+            else:
+                order = np.array(field.codes)
+                sorter = np.argsort(order)
+                pos = np.searchsorted(order, column, sorter=sorter)
+                pos = np.minimum(pos, len(order) - 1)
+                codes = sorter[pos]
+                if n and not (order[codes] == column).all():
+                    raise RuleParseError(f"Unknown class in '{field.name}' for {self.variable}")
+            shifts = np.arange(field.bits - 1, -1, -1, dtype=np.int64)
+            bits[:, col:col + field.bits] = (codes[:, None] >> shifts) & 1
+            col += field.bits
+        return np.packbits(bits, axis=1).reshape(n, self.record_size)
+
+    def unpack_records(self, packed):
+        """
+        Unpack an (n, record_size) uint8 array (or flat bytes) into a
+        structured array of `record_dtype()`.
+        """
+        packed = np.frombuffer(packed, dtype=np.uint8) if isinstance(packed, (bytes, bytearray, memoryview)) else packed
+        packed = packed.reshape(-1, self.record_size)
+        bits = np.unpackbits(packed, axis=1, count=self.bits).astype(np.int64)
+        records = np.zeros(len(packed), dtype=self.record_dtype())
+        col = 0
+        for field in self.fields:
+            weights = np.int64(1) << np.arange(field.bits - 1, -1, -1, dtype=np.int64)
+            codes = bits[:, col:col + field.bits] @ weights
+            col += field.bits
+            if field.kind == INT:
+                records[field.name] = codes + field.lo
+            else:
+                order = np.array(field.codes)
+                if len(codes) and codes.max() >= len(order):
+                    raise RuleParseError(f"Class index out of range for '{field.name}'")
+                records[field.name] = order[codes]
+        return records
+
+# ─── Files ─────────────────────────────────────────────────────────────────
+
+def pack_header(magic, header):
+    """
+    Encode a preamble (magic, version, length) followed by a compact JSON header.
+    """
+    body = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return _PREAMBLE.pack(magic, VERSION, len(body)) + body
+
+def unpack_header(f, magic):
+    """
+    Read a preamble + JSON header written by pack_header from an open binary file.
+    Returns (header_dict, data_offset).
+    """
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) != _PREAMBLE.size:
+        raise RuleParseError("Truncated DNA binary header")
+    found, version, length = _PREAMBLE.unpack(preamble)
+    if found != magic:
+        raise RuleParseError(f"Expected magic {magic!r}, found {found!r}")
+    if version != VERSION:
+        raise RuleParseError(f"Unsupported DNA binary version {version}")
+    header = json.loads(f.read(length).decode('utf-8'))
+    return header, _PREAMBLE.size + length
+
+def encode_header(layout):
+    return pack_header(MAGIC, layout.header())
+
+def read_header(f):
+    """
+    Read the header from an open binary file.
+    Returns (layout, data_offset).
+    """
+    header, offset = unpack_header(f, MAGIC)
+    return RecordLayout.from_header(header), offset
+
+def write_records(path, layout, records, append=False):
+    """
+    Write a structured array of one rule's records to `path`.
+    With append=True, records are added to an existing file of the same layout.
+    """
+    packed = layout.pack_records(records)
+    if append:
+        with open(path, 'rb') as f:
+            existing, _ = read_header(f)
+        if existing.header() != layout.header():
+            raise RuleParseError(f"Layout of '{path}' does not match rule '{layout.variable}'")
+        with open(path, 'ab') as f:
+            f.write(packed.tobytes())
+        return
+    with open(path, 'wb') as f:
+        f.write(encode_header(layout))
+        f.write(packed.tobytes())
+
+def read_records(path):
+    """
+    Read a binary records file. Returns (layout, records).
+    """
+    with open(path, 'rb') as f:
+        layout, _ = read_header(f)
+        data = f.read()
+    if len(data) % layout.record_size:
+        raise RuleParseError(f"Trailing partial record in '{path}'")
+    return layout, layout.unpack_records(np.frombuffer(data, dtype=np.uint8))
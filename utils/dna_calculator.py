@@ -2,10 +2,160 @@
 import os
 import json
 import re
+import hashlib
+from collections import namedtuple
+from functools import lru_cache
 
 class RuleParseError(Exception):
     pass
 
+# Compiled rule cache: plain JSON in the user's cache directory (never in the
+# rules folder), one file per rules folder. It is keyed by a hash of this
+# module's source, so a change to the compiler invalidates it by itself.
+RULE_CACHE_ENV = 'SONICDNA_CACHE_DIR'
+
+# Field kinds in a compiled rule layout
+INT = 'int'
+CLASS = 'class'
+
+# One fixed-width slice of a DNA string. `path` is the key path into the nested
+# values dict, `domain` is (min, max) for INT fields and the tuple of allowed
+# codes for CLASS fields.
+Field = namedtuple('Field', ['offset', 'width', 'kind', 'path', 'domain'])
+
+def split_class_order(class_order):
+    """
+    Split a class order such as "Z-A", "ZZ–AA" or "T-R-F-C" into its codes.
+    The delimiter can be '-' or '–'.
+    """
+    if '–' in class_order:
+        return class_order.split('–')
+    return class_order.split('-')
+
+def class_codes(class_order):
+    """
+    Expand a class order into the tuple of every allowed code, lowest first.
+    Two endpoints ("Z-A", "f-a", "ZZ–AA") are a per-character letter range;
+    three or more ("T-R-F-C") are an explicit list, which is how rule files
+    must spell any order that is not a contiguous run of letters.
+    """
+    codes = split_class_order(class_order)
+    if len(codes) != 2:
+        return tuple(codes)
+    lo, hi = codes
+    expanded = ['']
+    for a, b in zip(lo, hi):
+        step = 1 if ord(b) >= ord(a) else -1
+        letters = [chr(c) for c in range(ord(a), ord(b) + step, step)]
+        expanded = [prefix + ch for prefix in expanded for ch in letters]
+    return tuple(expanded)
+
+def _is_leaf(schema):
+    return 'description' in schema and (
+        'min' in schema or 'class' in schema or 'class_order' in schema
+        or 'band_class' in schema or 'index_min' in schema
+    )
+
+def _compile_leaf(schema, path, offset):
+    """
+    Turn one leaf schema into its list of Fields, starting at `offset`.
+    Composite leaves (band+hz, FM, sign+value, class+value) become several
+    Fields whose paths end in the composite's member names.
+    """
+    # 1) Composite: root of Frequency: band_class + hz_pad
+    if 'band_class' in schema and 'hz_pad' in schema:
+        return [
+            Field(offset, 1, CLASS, path + ('band',), class_codes(schema['band_class'])),
+            Field(offset + 1, schema['hz_pad'], INT, path + ('hz',),
+                  (schema.get('hz_min', 0), schema.get('hz_max'))),
+        ]
+
+    # 2) Composite FM: index_pad digits + rate_class letter + links_pad digits
+    if 'index_pad' in schema and 'rate_class' in schema and 'links_pad' in schema:
+        ip = schema['index_pad']
+        return [
+            Field(offset, ip, INT, path + ('index',),
+                  (schema.get('index_min', 0), schema.get('index_max'))),
+            Field(offset + ip, 1, CLASS, path + ('rate',), class_codes(schema['rate_class'])),
+            Field(offset + ip + 1, schema['links_pad'], INT, path + ('links',),
+                  (schema.get('links_min', 0), schema.get('links_max'))),
+        ]
+
+    # 3) Sign + numeric (micro-tuning, noise_floor, spectral_tilt, etc.)
+    if 'min' in schema and 'max' in schema and 'pad' in schema and 'sign' in schema:
+        return [
+            Field(offset, 1, CLASS, path + ('sign',), tuple(schema['sign'].split('/'))),
+            Field(offset + 1, schema['pad'], INT, path + ('value',),
+                  (schema['min'], schema['max'])),
+        ]
+
+    class_order = schema.get('class') or schema.get('class_order')
+
+    # 4) Class + numeric (Emotion axes: [class][value], e.g. Z800)
+    if 'min' in schema and 'max' in schema and 'pad' in schema and class_order:
+        codes = class_codes(class_order)
+        width = len(codes[0])
+        return [
+            Field(offset, width, CLASS, path + ('class',), codes),
+            Field(offset + width, schema['pad'], INT, path + ('value',),
+                  (schema['min'], schema['max'])),
+        ]
+
+    # 5) Numeric-only with min, max, pad
+    if 'min' in schema and 'max' in schema and 'pad' in schema:
+        return [Field(offset, schema['pad'], INT, path, (schema['min'], schema['max']))]
+
+    # 6) Pure class(es): single-letter or multi-letter (class or class_order)
+    if class_order:
+        codes = class_codes(class_order)
+        return [Field(offset, len(codes[0]), CLASS, path, codes)]
+
+    raise RuleParseError(f"Unrecognized leaf schema at {'.'.join(path)}: {schema}")
+
+def compile_fields(subvars, offset=0):
+    """
+    Compile a rule's `subvars` into a flat, ordered tuple of Fields.
+    Every rule is fixed-width, so each field's offset is known up front.
+    """
+    fields = []
+
+    def walk(schema, path):
+        nonlocal offset
+        if _is_leaf(schema):
+            leaf_fields = _compile_leaf(schema, path, offset)
+            fields.extend(leaf_fields)
+            offset = leaf_fields[-1].offset + leaf_fields[-1].width
+        else:
+            for child_name, child_schema in schema.items():
+                walk(child_schema, path + (child_name,))
+
+    for subvar_name, subvar_schema in subvars.items():
+        walk(subvar_schema, (subvar_name,))
+    return tuple(fields)
+
+def _build_tree(fields):
+    """
+    Build the nesting plan used to turn a flat list of field values back into
+    the nested values dict: a tuple of (key, field_index | subtree) pairs.
+    """
+    root = {}
+    for i, field in enumerate(fields):
+        node = root
+        for key in field.path[:-1]:
+            node = node.setdefault(key, {})
+        node[field.path[-1]] = i
+
+    def freeze(node):
+        return tuple((k, v if isinstance(v, int) else freeze(v)) for k, v in node.items())
+
+    return freeze(root)
+
+def _assemble(tree, flat):
+    return {
+        key: flat[node] if node.__class__ is int else _assemble(node, flat)
+        for key, node in tree
+    }
+
 class Rule:
     def __init__(self, filepath):
         with open(filepath, 'r', encoding='utf-8') as f:
@@ -16,10 +166,39 @@ class Rule:
         self.subvars = self.raw.get('subvars', {})
         if not self.variable or not self.prefix or not self.subvars:
             raise RuleParseError(f"Invalid rule file: {filepath}")
-        # Precompute a parsing plan (list of (name, schema)) in insertion order
-        self.plan = []
-        for subvar_name, subvar_schema in self.subvars.items():
-            self.plan.append((subvar_name, subvar_schema))
+        # Compile the schema once into a fixed-width field table; parse and
+        # serialize run off this table and never look at the schema again.
+        self._set_fields(compile_fields(self.subvars, offset=len(self.prefix)))
+
+    @classmethod
+    def from_compiled(cls, data):
+        """
+        Rebuild a Rule from compiled(): no JSON schema walk, no validation.
+        """
+        rule = cls.__new__(cls)
+        rule.raw = data['raw']
+        rule.variable = rule.raw['variable']
+        rule.prefix = rule.raw['prefix']
+        rule.subvars = rule.raw['subvars']
+        rule._set_fields(tuple(
+            Field(offset, width, kind, tuple(path), tuple(domain))
+            for offset, width, kind, path, domain in data['fields']
+        ))
+        return rule
+
+    def compiled(self):
+        """
+        The rule as plain JSON-serializable data (see from_compiled).
+        """
+        return {'raw': self.raw, 'fields': [list(f) for f in self.fields]}
+
+    def _set_fields(self, fields):
+        self.fields = fields
+        self.width = fields[-1].offset + fields[-1].width
+        self._slices = tuple(
+            (f.offset, f.offset + f.width, f.kind == INT) for f in fields
+        )
+        self._tree = _build_tree(fields)
 
     def parse(self, dna_string):
         """
@@ -28,259 +207,412 @@ class Rule:
         """
         if not dna_string.startswith(self.prefix):
             raise RuleParseError(f"DNA '{dna_string}' does not start with prefix '{self.prefix}'")
-        idx = len(self.prefix)
-        values = {}
-        for subvar_name, subvar_schema in self.plan:
-            val, idx = self._parse_subvar(subvar_schema, dna_string, idx)
-            values[subvar_name] = val
-        # If idx != len(dna_string), leftover characters
-        if idx != len(dna_string):
+        n = len(dna_string)
+        if n < self.width:
+            raise RuleParseError(
+                f"Unexpected end of string parsing rule '{self.variable}': "
+                f"expected {self.width} characters, got {n}"
+            )
+        if n > self.width:
             raise RuleParseError(
                 f"Extra characters after parsing rule '{self.variable}': "
-                f"parsed up to index {idx}, string length {len(dna_string)}"
+                f"parsed up to index {self.width}, string length {n}"
             )
-        return values
+        return self._decode(dna_string, 0)
+
+    def parse_at(self, text, pos):
+        """
+        Parse this rule's string starting at `pos` inside a longer `text`
+        (e.g. a full window frame) without slicing it out first.
+        Returns (nested_dict, end_pos).
+        """
+        if not text.startswith(self.prefix, pos):
+            raise RuleParseError(f"Expected prefix '{self.prefix}' at idx {pos}")
+        end = pos + self.width
+        if end > len(text):
+            raise RuleParseError(
+                f"Unexpected end of string parsing rule '{self.variable}' at idx {pos}: "
+                f"expected {self.width} characters, got {len(text) - pos}"
+            )
+        return self._decode(text, pos), end
+
+    def _decode(self, text, base):
+        flat = []
+        for start, end, is_int in self._slices:
+            fragment = text[base + start:base + end]
+            if is_int:
+                if not fragment.isdigit():
+                    raise RuleParseError(f"Numeric field parse error at idx {base + start}: got '{fragment}'")
+                flat.append(int(fragment))
+            else:
+                flat.append(fragment)
+        return _assemble(self._tree, flat)
 
     def serialize(self, values_dict):
         """
         Given a nested dict of values matching this rule’s subvars, rebuild the DNA string.
         """
         dna = [self.prefix]
-        for subvar_name, subvar_schema in self.plan:
-            if subvar_name not in values_dict:
-                raise RuleParseError(f"Missing subvar '{subvar_name}' for rule '{self.variable}'")
-            dna_part = self._serialize_subvar(subvar_schema, values_dict[subvar_name])
-            dna.append(dna_part)
+        for field in self.fields:
+            value = values_dict
+            for key in field.path:
+                if not isinstance(value, dict) or key not in value:
+                    raise RuleParseError(
+                        f"Missing subvar '{'.'.join(field.path)}' for rule '{self.variable}'"
+                    )
+                value = value[key]
+            dna.append(self._serialize_field(field, value))
         return ''.join(dna)
 
-    def _parse_subvar(self, schema, dna, idx):
+    def _serialize_field(self, field, value):
         """
-        Recursively parse one subvar. Returns (parsed_value, new_idx).
-        parsed_value is either a leaf (int, str, or dict for composite) or nested dict.
+        Build the exact substring for one compiled field.
         """
-        # If 'description' in schema, it’s a leaf schema. Otherwise, it's a group of children.
-        if 'description' in schema and (
-            'min' in schema or 'class' in schema or 'class_order' in schema
-            or 'band_class' in schema or 'index_min' in schema
-        ):
-            # Leaf case
-            return self._parse_leaf(schema, dna, idx)
+        if field.kind == INT:
+            if not isinstance(value, int):
+                raise RuleParseError(f"Expected int for numeric field '{'.'.join(field.path)}', got {value}")
+            text = str(value).zfill(field.width)
         else:
-            # Group (nested subfields)
-            result = {}
-            for child_name, child_schema in schema.items():
-                # Each child is itself a schema (leaf or group)
-                val, idx = self._parse_subvar(child_schema, dna, idx)
-                result[child_name] = val
-            return result, idx
-
-    def _parse_leaf(self, schema, dna, idx):
-        """
-        Figure out which pattern this leaf uses and parse accordingly.
-        Returns (value, new_idx).
-        - Numeric-only (min, max, pad)
-        - Numeric+sign  (min, max, pad, sign)
-        - Class-only (class or class_order)
-        - Composite (e.g. band_class + hz_pad; index_pad + rate_class + links_pad)
-        """
-        # 1) Composite: root of Frequency: band_class + hz_pad
-        if 'band_class' in schema and 'hz_pad' in schema:
-            # First char = class letter; next hz_pad digits = integer
-            length = 1 + schema['hz_pad']
-            fragment = dna[idx:idx+length]
-            if len(fragment) < length:
-                raise RuleParseError(f"Unexpected end of string parsing composite at idx {idx}")
-            cls = fragment[0]
-            num_str = fragment[1:]
-            if not num_str.isdigit():
-                raise RuleParseError(f"Expected {schema['hz_pad']} digits for hz, got '{num_str}'")
-            return {'band': cls, 'hz': int(num_str)}, idx + length
-
-        # 2) Composite FM: index_pad digits + rate_class letter + links_pad digits
-        if 'index_pad' in schema and 'rate_class' in schema and 'links_pad' in schema:
-            ip = schema['index_pad']
-            lp = schema['links_pad']
-            total_len = ip + 1 + lp
-            fragment = dna[idx:idx+total_len]
-            if len(fragment) < total_len:
-                raise RuleParseError(f"Unexpected end parsing FM composite at idx {idx}")
-            num_index = fragment[0:ip]
-            rate_letter = fragment[ip]
-            num_links = fragment[ip+1: ip+1+lp]
-            if not (num_index.isdigit() and num_links.isdigit()):
-                raise RuleParseError(f"FM composite numeric parse error at idx {idx}")
-            return {
-                'index': int(num_index),
-                'rate': rate_letter,
-                'links': int(num_links)
-            }, idx + total_len
-
-        # 3) Sign + numeric (micro-tuning, noise_floor, spectral_tilt, etc.)
-        if 'min' in schema and 'max' in schema and 'pad' in schema and 'sign' in schema:
-            # Sign = 1 character, numeric = pad digits
-            pad = schema['pad']
-            length = 1 + pad
-            fragment = dna[idx:idx+length]
-            if len(fragment) < length:
-                raise RuleParseError(f"Unexpected end parsing signed numeric at idx {idx}")
-            sign_char = fragment[0]
-            num_str = fragment[1:]
-            if not num_str.isdigit():
-                raise RuleParseError(f"Expected {pad} digits, got '{num_str}'")
-            val = int(num_str)
-            return {'sign': sign_char, 'value': val}, idx + length
-
-        # 4) Hz composites inside Perceived Pitch: fundamental/harmonic_centroid each min,max,pad
-        if 'min' in schema and 'max' in schema and 'pad' in schema and 'description' in schema and 'hz_' not in schema:
-            # If a leaf with numeric-only (no sign, no class): pad digits
-            pad = schema['pad']
-            fragment = dna[idx:idx+pad]
-            if len(fragment) < pad or not fragment.isdigit():
-                raise RuleParseError(f"Unexpected numeric parse at idx {idx}: got '{fragment}'")
-            return int(fragment), idx + pad
-
-        # 5) Pure class(es): single-letter or multi-letter (class or class_order)
-        if ('class' in schema or 'class_order' in schema) and 'min' not in schema and 'band_class' not in schema and 'index_min' not in schema:
-            class_order = schema.get('class') or schema.get('class_order')
-            # Determine delimiter – could be '-' or '–'
-            if '–' in class_order:
-                codes = class_order.split('–')
-            else:
-                codes = class_order.split('-')
-            first_code = codes[0]
-            length = len(first_code)
-            fragment = dna[idx:idx+length]
-            if len(fragment) < length:
-                raise RuleParseError(f"Unexpected end parsing class at idx {idx}")
-            return fragment, idx + length
-
-        # Catch-all: numeric-only with min,max,pad
-        if 'min' in schema and 'max' in schema and 'pad' in schema:
-            pad = schema['pad']
-            fragment = dna[idx:idx+pad]
-            if len(fragment) < pad or not fragment.isdigit():
-                raise RuleParseError(f"Numeric field parse error at idx {idx}: got '{fragment}'")
-            return int(fragment), idx + pad
-
-        # Should not get here
-        raise RuleParseError(f"Unrecognized leaf schema at idx {idx}: {schema}")
-
-    def _serialize_subvar(self, schema, value):
-        """
-        Serialize a single subvar (leaf or group) given the value(s).
-        """
-        # Leaf: has 'description' and one of the identifying keys
-        if 'description' in schema and (
-            'min' in schema or 'class' in schema or 'band_class' in schema
-            or 'index_min' in schema
-        ):
-            return self._serialize_leaf(schema, value)
-        # Group: iterate child schemas
-        parts = []
-        for child_name, child_schema in schema.items():
-            if child_name not in value:
-                raise RuleParseError(f"Missing nested '{child_name}' in value {value}")
-            parts.append(self._serialize_subvar(child_schema, value[child_name]))
-        return ''.join(parts)
+            if not isinstance(value, str):
+                raise RuleParseError(f"Expected str for class field '{'.'.join(field.path)}', got {value}")
+            text = value
+        if len(text) != field.width:
+            raise RuleParseError(
+                f"Field '{'.'.join(field.path)}' needs {field.width} characters, got '{text}'"
+            )
+        return text
 
-    def _serialize_leaf(self, schema, value):
-        """
-        Build the exact substring corresponding to this leaf schema.
-        """
-        # 1) Composite: band_class + hz_pad
-        if 'band_class' in schema and 'hz_pad' in schema:
-            cls = value.get('band')
-            hz = value.get('hz')
-            if cls is None or hz is None:
-                raise RuleParseError(f"Expected 'band' and 'hz' in {value}")
-            hz_pad = schema['hz_pad']
-            return f"{cls}{str(hz).zfill(hz_pad)}"
-
-        # 2) Composite FM: index_pad + rate_class + links_pad
-        if 'index_pad' in schema and 'rate_class' in schema and 'links_pad' in schema:
-            ip = schema['index_pad']
-            lp = schema['links_pad']
-            idx_num = value.get('index')
-            rate = value.get('rate')
-            links = value.get('links')
-            if idx_num is None or rate is None or links is None:
-                raise RuleParseError(f"Expected 'index', 'rate', 'links' in {value}")
-            return f"{str(idx_num).zfill(ip)}{rate}{str(links).zfill(lp)}"
-
-        # 3) Sign + numeric
-        if 'sign' in schema and 'pad' in schema and 'min' in schema:
-            sign_char = value.get('sign')
-            num = value.get('value')
-            if sign_char is None or num is None:
-                raise RuleParseError(f"Expected dict with 'sign' and 'value' for {schema}")
-            pad = schema['pad']
-            return f"{sign_char}{str(num).zfill(pad)}"
-
-        # 4) Pure numeric (min,max,pad)
-        if 'min' in schema and 'max' in schema and 'pad' in schema and 'band_class' not in schema and 'index_min' not in schema:
-            pad = schema['pad']
-            if not isinstance(value, int):
-                raise RuleParseError(f"Expected int for numeric field, got {value}")
-            return str(value).zfill(pad)
 
-        # 5) Pure class (class or class_order)
-        if ('class' in schema or 'class_order' in schema) and 'min' not in schema and 'band_class' not in schema:
-            # Value should be a string of correct length
-            class_order = schema.get('class') or schema.get('class_order')
-            if not isinstance(value, str):
-                raise RuleParseError(f"Expected str for class field, got {value}")
-            # Check length matches first code length
-            if '–' in class_order:
-                codes = class_order.split('–')
-            else:
-                codes = class_order.split('-')
-            first_code = codes[0]
-            needed = len(first_code)
-            if len(value) != needed:
-                raise RuleParseError(f"Expected class of length {needed}, got '{value}'")
-            return value
+class FrozenDict(dict):
+    """
+    Read-only dict used for cached parse results, which are shared between
+    callers. Still a dict, so json.dump, isinstance checks and flatten_parsed
+    work unchanged. copy.copy gives a plain top-level dict and copy.deepcopy
+    (or thaw) a fully mutable one; pickling keeps it frozen.
+    """
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached parse results are read-only; use thaw() (or copy.deepcopy) "
+                        "for a mutable copy")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+def freeze(value):
+    """
+    Recursively convert nested dicts into FrozenDicts.
+    """
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    return value
+
+def thaw(value):
+    """
+    Recursively convert nested (Frozen)dicts into plain, mutable dicts.
+    """
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    return value
+
+def build_prefix_trie(rules):
+    """
+    Build a character trie over rule prefixes: nested dicts keyed by character,
+    with the Rule stored under the None key at the node where its prefix ends.
+    """
+    trie = {}
+    for prefix, rule in rules.items():
+        node = trie
+        for ch in prefix:
+            node = node.setdefault(ch, {})
+        node[None] = rule
+    return trie
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+@lru_cache(maxsize=None)
+def compiler_digest():
+    """
+    sha256 of this module's source: the compiled rule cache's key.
+    """
+    return _file_digest(__file__)
+
+def rule_cache_path(rules_folder):
+    """
+    Cache file for `rules_folder`: under $SONICDNA_CACHE_DIR, else
+    $XDG_CACHE_HOME/sonicdna, else ~/.cache/sonicdna.
+    """
+    folder = os.environ.get(RULE_CACHE_ENV)
+    if not folder:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        folder = os.path.join(base, 'sonicdna')
+    key = hashlib.sha256(os.path.abspath(rules_folder).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(folder, f"rules-{key}.json")
 
-        # Should not get here
-        raise RuleParseError(f"Cannot serialize leaf schema: {schema}")
+def load_rule_cache(cache_path):
+    """
+    Read the compiled rule cache: { fname: entry } where each entry holds the
+    rule file's size, mtime_ns, sha256, prefix and its compiled data.
+    A missing, unreadable or outdated cache reads as empty.
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('compiler') != compiler_digest():
+        return {}
+    return cache.get('files', {})
 
+def save_rule_cache(cache_path, entries):
+    """
+    Atomically write the compiled rule cache. Failing to write (e.g. a
+    read-only home) only costs the speed-up, so errors are ignored.
+    """
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'compiler': compiler_digest(), 'files': entries}, f, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def prefixes_used(prefixes, dna_strings):
+    """
+    Return the subset of `prefixes` that start at least one of `dna_strings`.
+    """
+    prefixes = set(prefixes)
+    lengths = {len(p) for p in prefixes}
+    seen = set()
+    for dna in dna_strings:
+        for length in lengths:
+            seen.add(dna[:length])
+    return prefixes & seen
 
 class DNACalculator:
-    def __init__(self, rules_folder='rules'):
+    def __init__(self, rules_folder='rules', cache=True, needed_for=None, parse_cache_size=0):
         """
         Loads all .json rule files from `rules_folder`.
+        With `cache`, compiled rules are reused from a JSON cache in the user's
+        cache directory (see rule_cache_path) as long as the rule files and
+        the compiler are unchanged.
+        With `needed_for` (an iterable of DNA strings), only rules whose prefix
+        appears in those strings are loaded.
+        With `parse_cache_size` > 0, parse() memoizes up to that many distinct
+        DNA strings (least recently used are evicted) and returns read-only
+        FrozenDict results shared between calls; see parse_cache_info().
         """
         self.rules = {}  # prefix -> Rule instance
-        self._load_rules(rules_folder)
+        self._load_rules(rules_folder, cache, needed_for)
+        self._index_rules()
+        self._cached_parse = None
+        if parse_cache_size:
+            self._cached_parse = lru_cache(maxsize=parse_cache_size)(self._parse_frozen)
 
-    def _load_rules(self, folder):
+    def _load_rules(self, folder, cache=True, needed_for=None):
         if not os.path.isdir(folder):
             raise FileNotFoundError(f"Rules folder not found: '{folder}'")
-        for fname in os.listdir(folder):
-            if fname.lower().endswith('.json'):
-                path = os.path.join(folder, fname)
-                rule = Rule(path)
-                if rule.prefix in self.rules:
-                    raise RuleParseError(f"Duplicate prefix '{rule.prefix}' in {fname}")
-                self.rules[rule.prefix] = rule
+        cache_path = rule_cache_path(folder) if cache else None
+        cached = load_rule_cache(cache_path) if cache_path else {}
+        entries = {}
+        compiled = {}  # fname -> Rule compiled during this load
+        dirty = False
+        for fname in sorted(os.listdir(folder)):
+            if not fname.lower().endswith('.json'):
+                continue
+            path = os.path.join(folder, fname)
+            st = os.stat(path)
+            entry = cached.get(fname)
+            if entry is None or (entry['size'], entry['mtime_ns']) != (st.st_size, st.st_mtime_ns):
+                digest = _file_digest(path)
+                if entry is None or entry['sha256'] != digest:
+                    rule = Rule(path)
+                    compiled[fname] = rule
+                    entry = {
+                        'prefix': rule.prefix,
+                        'sha256': digest,
+                        'rule': rule.compiled(),
+                    }
+                entry = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+                dirty = True
+            entries[fname] = entry
+        if cache_path and (dirty or entries.keys() != cached.keys()):
+            save_rule_cache(cache_path, entries)
+
+        seen = {}
+        for fname, entry in entries.items():
+            if entry['prefix'] in seen:
+                raise RuleParseError(f"Duplicate prefix '{entry['prefix']}' in {fname}")
+            seen[entry['prefix']] = fname
+        wanted = seen.keys() if needed_for is None else prefixes_used(seen, needed_for)
+        for prefix, fname in seen.items():
+            if prefix in wanted:
+                rule = compiled.get(fname)
+                self.rules[prefix] = rule if rule is not None else Rule.from_compiled(entries[fname]['rule'])
+
+    def _index_rules(self):
+        """
+        Build the dispatch indexes used by parse/serialize.
+        When every prefix has the same length (the normal case, e.g. VOL/FRE/ENV),
+        a DNA string is dispatched with one slice and one dict lookup; otherwise
+        a prefix trie is walked. Variable names map straight to their Rule.
+        """
+        self.by_variable = {}
+        for rule in self.rules.values():
+            if rule.variable in self.by_variable:
+                raise RuleParseError(f"Duplicate variable '{rule.variable}' (prefix '{rule.prefix}')")
+            self.by_variable[rule.variable] = rule
+        lengths = {len(prefix) for prefix in self.rules}
+        self._prefix_len = lengths.pop() if len(lengths) == 1 else None
+        self._prefix_trie = None if self._prefix_len else build_prefix_trie(self.rules)
+
+    def match(self, dna_string):
+        """
+        Return the Rule whose prefix starts `dna_string`, or None.
+        With mixed-length prefixes the longest matching prefix wins.
+        """
+        return self.match_at(dna_string, 0)
+
+    def match_at(self, text, pos):
+        """
+        Return the Rule whose prefix starts at `pos` in `text`, or None.
+        """
+        if self._prefix_len is not None:
+            return self.rules.get(text[pos:pos + self._prefix_len])
+        node = self._prefix_trie
+        found = None
+        for i in range(pos, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
 
     def parse(self, dna_string):
         """
         Identify which rule applies (by prefix), then parse.
         Returns { 'rule': variable_name, 'values': nested_dict }.
         """
-        # Try to match any known prefix
-        for prefix, rule in self.rules.items():
-            if dna_string.startswith(prefix):
-                parsed = rule.parse(dna_string)
-                return {'rule': rule.variable, 'values': parsed}
-        raise RuleParseError(f"No matching rule for DNA '{dna_string}'")
+        if self._cached_parse is not None:
+            return self._cached_parse(dna_string)
+        rule = self.match(dna_string)
+        if rule is None:
+            raise RuleParseError(f"No matching rule for DNA '{dna_string}'")
+        return {'rule': rule.variable, 'values': rule.parse(dna_string)}
+
+    def _parse_frozen(self, dna_string):
+        rule = self.match(dna_string)
+        if rule is None:
+            raise RuleParseError(f"No matching rule for DNA '{dna_string}'")
+        return FrozenDict(rule=rule.variable, values=freeze(rule.parse(dna_string)))
+
+    def parse_cache_info(self):
+        """
+        (hits, misses, maxsize, currsize) of the parse cache, or None if disabled.
+        """
+        if self._cached_parse is None:
+            return None
+        return self._cached_parse.cache_info()
+
+    def clear_parse_cache(self):
+        if self._cached_parse is not None:
+            self._cached_parse.cache_clear()
+
+    def parse_batch(self, dna_strings):
+        """
+        Columnar parse of many DNA strings at once (requires NumPy).
+        Returns { variable_name: RuleBatch(rule, index, records, ok) } where
+        `records` is a structured array with one column per field; see
+        utils.dna_batch.parse_batch.
+        """
+        from utils.dna_batch import parse_batch
+        return parse_batch(self, dna_strings)
+
+    def sample(self, rule_or_variable, n, seed=None, columns=False):
+        """
+        Generate `n` random valid DNA strings for one rule (requires NumPy).
+        `rule_or_variable` is a Rule, a variable name or a prefix. Every field
+        is drawn uniformly from its min/max range or class codes.
+        With `columns`, the structured records are returned instead of
+        strings (same layout as parse_batch). Same `seed`, same output.
+        """
+        from utils.dna_batch import sample
+        rule = rule_or_variable
+        if not isinstance(rule, Rule):
+            rule = self.by_variable.get(rule_or_variable) or self.rules.get(rule_or_variable)
+            if rule is None:
+                raise RuleParseError(f"No rule found for variable '{rule_or_variable}'")
+        return sample(rule, n, seed, columns)
+
+    def parse_frame(self, frame):
+        """
+        Parse one full window frame: the concatenated DNA strings of several
+        rules (e.g. "VOL…FRE…ENV…"), walked in a single pass using each rule's
+        fixed width. Returns { variable_name: nested_dict } in frame order.
+        """
+        values = {}
+        pos = 0
+        n = len(frame)
+        while pos < n:
+            rule = self.match_at(frame, pos)
+            if rule is None:
+                raise RuleParseError(f"No matching rule at idx {pos} of frame '{frame}'")
+            if rule.variable in values:
+                raise RuleParseError(f"Rule '{rule.variable}' appears twice in frame '{frame}'")
+            values[rule.variable], pos = rule.parse_at(frame, pos)
+        return values
+
+    def serialize_frame(self, frame_values, order=None):
+        """
+        Build a window frame from { variable_name: nested_dict }.
+        Rules are concatenated in `order` (variable names) if given, otherwise
+        in the dict's order.
+        """
+        names = frame_values.keys() if order is None else order
+        parts = []
+        for name in names:
+            rule = self.by_variable.get(name)
+            if rule is None:
+                raise RuleParseError(f"No rule found for variable '{name}'")
+            if name not in frame_values:
+                raise RuleParseError(f"Missing values for rule '{name}' in frame")
+            parts.append(rule.serialize(frame_values[name]))
+        return ''.join(parts)
 
     def serialize(self, variable_name, values_dict):
         """
         Given a variable name (the human-readable name, e.g. "Volume"),
         find the rule and serialize values to DNA string.
         """
-        for rule in self.rules.values():
-            if rule.variable == variable_name:
-                return rule.serialize(values_dict)
-        raise RuleParseError(f"No rule found for variable '{variable_name}'")
+        rule = self.by_variable.get(variable_name)
+        if rule is None:
+            raise RuleParseError(f"No rule found for variable '{variable_name}'")
+        return rule.serialize(values_dict)
+
+    def serialize_batch(self, variable_name, columns, as_bytes=False):
+        """
+        Serialize many windows of one rule at once from NumPy columns (one per
+        field, keyed by 'root.hz' or 'Frequency.root.hz'; requires NumPy).
+        Returns a list of DNA strings, or with `as_bytes` a fixed-width bytes
+        array; see utils.dna_batch.serialize_columns.
+        """
+        from utils.dna_batch import serialize_columns
+        rule = self.by_variable.get(variable_name)
+        if rule is None:
+            raise RuleParseError(f"No rule found for variable '{variable_name}'")
+        return serialize_columns(rule, columns, as_bytes)
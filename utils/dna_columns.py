@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Per-rule columnar output.
+
+Instead of one CSV whose header is the union of every rule's keys, each rule
+gets its own folder with one typed .npy file per flattened field (the same
+names flatten_parsed produces, e.g. "Frequency.root.hz"), plus the input row
+positions. A manifest.json describes every column, so downstream loaders can
+np.load(..., mmap_mode='r') exactly the columns they need.
+
+    toSequence_columns/
+      manifest.json
+      errors.ndjson          ← rows that matched no rule or did not parse
+      VOL/_index.npy         ← input line positions of this rule's rows
+      VOL/amp.npy
+      FRE/root.hz.npy
+      ...
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+from utils.dna_calculator import RuleParseError
+from utils.dna_batch import column_name
+
+INDEX_COLUMN = '_index'
+
+def write_columnar(calculator, dna_list, out_dir):
+    """
+    Parse `dna_list` with DNACalculator.parse_batch and write per-rule column
+    files under `out_dir` (replacing any previous contents).
+    Returns (manifest_path, parsed_count, error_count).
+    """
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+
+    parsed = calculator.parse_batch(dna_list)
+    error_rows = list(parsed.get(None, []))
+    manifest = {'rows': len(dna_list), 'rules': {}}
+    parsed_count = 0
+
+    for variable, batch in parsed.items():
+        if variable is None:
+            continue
+        rule = batch.rule
+        keep = batch.ok
+        error_rows.extend(batch.index[~keep])
+        if not keep.any():
+            continue
+        rule_dir = os.path.join(out_dir, rule.prefix)
+        os.makedirs(rule_dir)
+        records = batch.records[keep]
+        index = batch.index[keep]
+        np.save(os.path.join(rule_dir, INDEX_COLUMN + '.npy'), index.astype(np.int64))
+        columns = {}
+        for field in rule.fields:
+            name = column_name(field)
+            fname = f"{name}.npy"
+            column = np.ascontiguousarray(records[name])
+            np.save(os.path.join(rule_dir, fname), column)
+            columns[f"{rule.variable}.{name}"] = {
+                'file': f"{rule.prefix}/{fname}",
+                'dtype': column.dtype.str,
+            }
+        manifest['rules'][rule.variable] = {
+            'prefix': rule.prefix,
+            'count': int(len(index)),
+            'index': f"{rule.prefix}/{INDEX_COLUMN}.npy",
+            'columns': columns,
+        }
+        parsed_count += len(index)
+
+    error_rows.sort()
+    if error_rows:
+        with open(os.path.join(out_dir, 'errors.ndjson'), 'w', encoding='utf-8') as f:
+            for row in error_rows:
+                dna_str = dna_list[row]
+                try:
+                    calculator.parse(dna_str)
+                    message = 'Invalid DNA'
+                except RuleParseError as e:
+                    message = str(e)
+                f.write(json.dumps({'row': int(row), 'dna': dna_str, 'error': message}) + '\n')
+        manifest['errors'] = {'count': len(error_rows), 'file': 'errors.ndjson'}
+
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path, parsed_count, len(error_rows)
+
+def load_columns(out_dir, variable, names=None, mmap_mode='r'):
+    """
+    Load (memory-mapped by default) columns of one rule from a columnar output.
+    `names` are flattened column names; default is every column of the rule.
+    Returns { name: array } plus the rule's row index under INDEX_COLUMN.
+    """
+    with open(os.path.join(out_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    entry = manifest['rules'][variable]
+    names = entry['columns'].keys() if names is None else names
+    out = {INDEX_COLUMN: np.load(os.path.join(out_dir, entry['index']), mmap_mode=mmap_mode)}
+    for name in names:
+        out[name] = np.load(os.path.join(out_dir, entry['columns'][name]['file']), mmap_mode=mmap_mode)
+    return out
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+dna_server.py
+
+Local asyncio ingest service: one warm DNACalculator answering parse and
+serialize requests from other processes over TCP or a Unix socket, without
+going through data/raw/toSequence.txt.
+
+Framing is newline-delimited JSON, one object per line:
+
+  → {"id": 1, "op": "parse", "dna": "VOL08900750712"}
+  → {"id": 2, "op": "serialize", "variable": "Volume", "values": {...}}
+  → {"id": 3, "op": "parse_frame", "frame": "VOL…FRE…"}
+  ← {"id": 1, "ok": true, "result": {"rule": "Volume", "values": {...}}}
+  ← {"id": 9, "ok": false, "error": "No matching rule for DNA 'XYZ'"}
+
+Requests from all clients are micro-batched: the batcher collects up to
+`max_batch` requests or waits `max_delay` seconds, runs them back to back on
+the calculator, and hands each connection its responses. Every connection
+has its own writer task, so a client that stops reading only stalls itself:
+once it has `max_pending` responses unwritten, the server stops reading its
+requests. The shared request queue is bounded by `max_queue`.
+
+Lines longer than `line_limit` bytes are skipped up to their newline and
+answered with an id-less error, so the connection stays usable.
+
+Run standalone:
+    python -m utils.dna_server [--host 127.0.0.1] [--port 8765] [--unix PATH]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import stat
+
+from utils.dna_calculator import DNACalculator, RuleParseError
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BATCH = 512
+MAX_DELAY = 0.002
+# Requests waiting for the batcher, and unwritten responses per connection
+MAX_QUEUE = 8192
+MAX_PENDING = 1024
+PARSE_CACHE_SIZE = 65536
+# Longest request / response line (asyncio's default is 64 KiB)
+LINE_LIMIT = 1 << 20
+
+def _dumps(obj):
+    return (json.dumps(obj, separators=(',', ':')) + '\n').encode('utf-8')
+
+class DNAServer:
+    def __init__(self, calculator, max_batch=MAX_BATCH, max_delay=MAX_DELAY, line_limit=LINE_LIMIT,
+                 max_queue=MAX_QUEUE, max_pending=MAX_PENDING):
+        self.calculator = calculator
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.line_limit = line_limit
+        self.max_queue = max_queue
+        self.max_pending = max_pending
+        self._queue = None
+        self._server = None
+        self._batcher = None
+        self._connections = set()
+        self.handled = 0
+        self.batches = 0
+
+    # ─── Lifecycle ─────────────────────────────────────────────────────────
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """
+        Listen on a Unix socket at `path` if given, otherwise on host:port
+        (port 0 picks a free port; see `address`).
+        """
+        if path is not None:
+            try:
+                mode = os.lstat(path).st_mode
+            except FileNotFoundError:
+                mode = None
+            if mode is not None:
+                # Only a stale socket from an earlier run may be replaced
+                if not stat.S_ISSOCK(mode):
+                    raise FileExistsError(f"Refusing to replace '{path}': not a socket")
+                os.remove(path)
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._batcher = asyncio.create_task(self._run_batches())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=path,
+                                                           limit=self.line_limit)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port,
+                                                      limit=self.line_limit)
+        return self
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        tasks = [conn.task for conn in self._connections]
+        if self._batcher is not None:
+            tasks.append(self._batcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ─── Connections ───────────────────────────────────────────────────────
+
+    async def _handle_client(self, reader, writer):
+        conn = _Connection(writer, self.max_pending)
+        self._connections.add(conn)
+        conn.task.add_done_callback(lambda _: self._connections.discard(conn))
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as e:
+                    line = e.partial  # last line without a newline
+                    if not line:
+                        break
+                except asyncio.LimitOverrunError:
+                    await _skip_line(reader)
+                    await conn.send(_dumps({'id': None, 'ok': False,
+                                            'error': f"Bad request: line longer than {self.line_limit} bytes"}))
+                    continue
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    await conn.send(_dumps({'id': None, 'ok': False, 'error': f"Bad request: {e}"}))
+                    continue
+                await conn.slots.acquire()
+                await self._queue.put((request, conn))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        # Queued behind this client's last request, so its responses go out
+        # before its writer closes the connection
+        await self._queue.put((None, conn))
+
+    # ─── Batching ──────────────────────────────────────────────────────────
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Never waits on a socket: each connection's writer task sends
+            for request, conn in batch:
+                if request is None:
+                    conn.outbox.put_nowait(None)
+                else:
+                    conn.outbox.put_nowait(_dumps(self.execute(request)))
+                    self.handled += 1
+            self.batches += 1
+
+    def execute(self, request):
+        """
+        Run one request against the calculator and build its response.
+        """
+        rid = request.get('id')
+        op = request.get('op')
+        try:
+            if op == 'parse':
+                result = self.calculator.parse(request['dna'])
+            elif op == 'serialize':
+                result = self.calculator.serialize(request['variable'], request['values'])
+            elif op == 'parse_frame':
+                result = self.calculator.parse_frame(request['frame'])
+            elif op == 'serialize_frame':
+                result = self.calculator.serialize_frame(request['values'], request.get('order'))
+            else:
+                return {'id': rid, 'ok': False, 'error': f"Unknown op '{op}'"}
+        except KeyError as e:
+            return {'id': rid, 'ok': False, 'error': f"Missing request field {e}"}
+        except RuleParseError as e:
+            return {'id': rid, 'ok': False, 'error': str(e)}
+        except Exception as e:
+            # Malformed payloads (wrong types etc.) must not kill the batcher
+            return {'id': rid, 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        return {'id': rid, 'ok': True, 'result': result}
+
+class _Connection:
+    """
+    One client's response side: an outbox drained by its own writer task.
+    `slots` counts responses the client may have outstanding; each is taken
+    before a response is produced and given back once it has been written.
+    """
+
+    def __init__(self, writer, max_pending):
+        self.writer = writer
+        self.slots = asyncio.Semaphore(max_pending)
+        self.outbox = asyncio.Queue()
+        self.task = asyncio.create_task(self._write_responses())
+
+    async def send(self, line):
+        await self.slots.acquire()
+        self.outbox.put_nowait(line)
+
+    async def _write_responses(self):
+        try:
+            while True:
+                lines = [await self.outbox.get()]
+                while not self.outbox.empty():
+                    lines.append(self.outbox.get_nowait())
+                done = None in lines
+                if done:
+                    lines = lines[:lines.index(None)]
+                if lines and not self.writer.is_closing():
+                    self.writer.write(b''.join(lines))
+                    try:
+                        await self.writer.drain()
+                    except ConnectionError:
+                        pass
+                for _ in lines:
+                    self.slots.release()
+                if done:
+                    return
+        finally:
+            self.writer.close()
+
+async def _skip_line(reader):
+    """
+    Discard the rest of an over-long line, up to and including its newline.
+    """
+    while True:
+        try:
+            await reader.readuntil(b'\n')
+            return
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+
+class DNAClientError(Exception):
+    pass
+
+class DNAClient:
+    """
+    Pipelining asyncio client: many requests can be in flight at once; each
+    resolves when the response with its id arrives.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._recv_task = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(DNAClientError("Connection closed"))
+            self._pending.clear()
+
+    async def request(self, op, **payload):
+        """
+        Send one request and return its `result`; raise DNAClientError on error.
+        """
+        rid = next(self._ids)
+        data = _dumps(dict(payload, id=rid, op=op))
+        if len(data) > LINE_LIMIT:
+            # The server could not tell which request its error belongs to
+            raise DNAClientError(f"Request line longer than {LINE_LIMIT} bytes")
+        future = asyncio.get_running_loop().create_future()
+        self._pending[rid] = future
+        self._writer.write(data)
+        await self._writer.drain()
+        response = await future
+        if not response.get('ok'):
+            raise DNAClientError(response.get('error'))
+        return response['result']
+
+    async def parse(self, dna):
+        return await self.request('parse', dna=dna)
+
+    async def parse_many(self, dna_strings):
+        """
+        Pipeline many parse requests; results come back in input order.
+        Failed strings yield the DNAClientError instead of a result.
+        """
+        return await asyncio.gather(*(self.parse(d) for d in dna_strings), return_exceptions=True)
+
+    async def serialize(self, variable, values):
+        return await self.request('serialize', variable=variable, values=values)
+
+    async def parse_frame(self, frame):
+        return await self.request('parse_frame', frame=frame)
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._recv_task
+
+async def open_loopback(calculator=None, rules_folder='rules'):
+    """
+    Start a server on an ephemeral localhost port and connect a client to it.
+    Returns (server, client); close both when done.
+    """
+    calculator = calculator or DNACalculator(rules_folder=rules_folder,
+                                             parse_cache_size=PARSE_CACHE_SIZE)
+    server = await DNAServer(calculator).start(port=0)
+    host, port = server.address[:2]
+    client = await DNAClient.connect(host, port)
+    return server, client
+
+async def _serve(args):
+    calculator = DNACalculator(rules_folder=args.rules, parse_cache_size=PARSE_CACHE_SIZE)
+    server = await DNAServer(calculator).start(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{server.address[1]}"
+    print(f"[DNAServer] Serving {len(calculator.rules)} rules on {where}")
+    await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local DNA parse/serialize service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP.")
+    parser.add_argument("--rules", default="rules", help="Rules folder.")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        print("\n[DNAServer] Interrupted by user. Exiting.")
+    except FileExistsError as e:
+        print(f"[DNAServer][ERROR] {e}")
+
+if __name__ == '__main__':
+    main()
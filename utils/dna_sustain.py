@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Sustain ("period") notation for window streams.
+
+rules_structuring.txt §7: a period marks a window whose DNA matches the
+previous window of the same rule. Such a window is written in place as the
+rule prefix followed by a period; consecutive repeats of the same rule share
+one marker with one period per window:
+
+    window DNA   VOL08900750712  FRE04400  VOL08900750712  FRE04400  FRE04400
+    tokens       VOL08900750712  FRE04400  VOL.            FRE..
+
+Every other window is written as its full DNA. Tokens come out in input
+order, one per window or per run of adjacent repeats, so interleaved streams
+(one string per rule per window) keep their window alignment and
+decode_periods(encode_periods(windows)) == windows.
+
+Encoder and decoder are generators holding the last DNA of each rule, so
+memory is bounded by the number of rules. A marker grows by one period per
+window; `max_run` caps the periods per marker so a live stream emits a
+sustained note at least every `max_run` windows.
+"""
+from utils.dna_calculator import RuleParseError
+
+PERIOD = '.'
+PREFIX_LEN = 3
+
+def _rule_key(calculator):
+    if calculator is None:
+        return lambda dna: dna[:PREFIX_LEN]
+
+    def key(dna):
+        rule = calculator.match(dna)
+        if rule is None:
+            raise RuleParseError(f"No matching rule for DNA '{dna}'")
+        return rule.prefix
+    return key
+
+def encode_periods(dna_strings, calculator=None, max_run=None):
+    """
+    Yield sustain tokens for a stream of window DNA strings. Rules are keyed
+    by their prefix (via `calculator` if given, else the first three
+    characters); pass the same `calculator` to the decoder.
+    """
+    key = _rule_key(calculator)
+    last = {}  # rule key -> previous DNA of that rule
+    pending, count = None, 0  # run of adjacent repeated windows not yet emitted
+    for dna in dna_strings:
+        dna = dna.strip()
+        if not dna:
+            continue
+        if PERIOD in dna:
+            raise RuleParseError(f"Window DNA may not contain '{PERIOD}': '{dna}'")
+        k = key(dna)
+        if last.get(k) == dna:
+            if k == pending and (max_run is None or count < max_run):
+                count += 1
+                continue
+            if pending is not None:
+                yield pending + PERIOD * count
+            pending, count = k, 1
+            continue
+        if pending is not None:
+            yield pending + PERIOD * count
+            pending, count = None, 0
+        last[k] = dna
+        yield dna
+    if pending is not None:
+        yield pending + PERIOD * count
+
+def iter_runs(tokens, calculator=None):
+    """
+    Yield (dna, count) for each sustain token, in window order, without
+    expanding markers: a full DNA gives (dna, 1), a marker the previous DNA
+    of its rule and its period count. Consumers can parse `dna` once and
+    reuse the result `count` times.
+    """
+    key = _rule_key(calculator)
+    last = {}
+    for token in tokens:
+        token = token.strip()
+        if not token:
+            continue
+        prefix = token.rstrip(PERIOD)
+        if prefix == token:
+            last[key(token)] = token
+            yield token, 1
+            continue
+        if PERIOD in prefix:
+            raise RuleParseError(f"Malformed sustain token '{token}'")
+        if prefix not in last:
+            raise RuleParseError(f"Sustain token '{token}' has no earlier window of its rule")
+        yield last[prefix], len(token) - len(prefix)
+
+def decode_periods(tokens, calculator=None):
+    """
+    Expand sustain tokens back into one DNA string per window.
+    """
+    for dna, count in iter_runs(tokens, calculator):
+        for _ in range(count):
+            yield dna
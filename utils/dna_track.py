@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped track store.
+
+A track file holds every window of one audio track as a fixed-size slot:
+
+    [presence bitmap][rule 1 record][rule 2 record]...
+
+Records are the bit-packed records of utils.dna_binary, so slot i lives at
+data_offset + i * slot_size and window i covers [i * window, (i + 1) * window)
+seconds (0.25s per rules_timing.txt). Reads go through mmap and return NumPy
+views into the mapping; nothing is loaded until it is touched.
+"""
+import math
+import mmap
+import os
+
+import numpy as np
+
+from utils.dna_calculator import RuleParseError
+from utils.dna_binary import RecordLayout, pack_header, unpack_header
+
+TRACK_MAGIC = b'SDNT'
+WINDOW_SECONDS = 0.25
+
+def slot_dtype(layouts):
+    """
+    Structured dtype of one slot: a 'present' bitmap (one bit per rule, in
+    layout order) followed by one raw byte field per rule prefix.
+    """
+    mask_bytes = max(1, (len(layouts) + 7) // 8)
+    fields = [('present', np.uint8, (mask_bytes,))]
+    fields += [(layout.prefix, np.uint8, (layout.record_size,)) for layout in layouts]
+    return np.dtype(fields)
+
+def _track_header(layouts, window):
+    return {'window': window, 'rules': [layout.header() for layout in layouts]}
+
+class TrackWriter:
+    def __init__(self, path, layouts, window=WINDOW_SECONDS):
+        """
+        Create (or truncate) a track file at `path` for the given RecordLayouts.
+        """
+        self.path = path
+        self.layouts = tuple(layouts)
+        self.window = window
+        self.dtype = slot_dtype(self.layouts)
+        self._bit = {layout.prefix: i for i, layout in enumerate(self.layouts)}
+        self._by_name = {layout.variable: layout for layout in self.layouts}
+        self._by_name.update({layout.prefix: layout for layout in self.layouts})
+        self._f = open(path, 'wb')
+        self._f.write(pack_header(TRACK_MAGIC, _track_header(self.layouts, window)))
+        self.count = 0
+
+    @classmethod
+    def for_calculator(cls, path, calculator, window=WINDOW_SECONDS):
+        layouts = [RecordLayout.from_rule(rule) for rule in calculator.rules.values()]
+        return cls(path, layouts, window)
+
+    def append(self, window_values):
+        """
+        Append one window. `window_values` maps variable name or prefix to the
+        nested values dict of that rule; rules left out are marked absent.
+        """
+        slot = np.zeros((), dtype=self.dtype)
+        for key, values in window_values.items():
+            layout = self._by_name.get(key)
+            if layout is None:
+                raise RuleParseError(f"Rule '{key}' is not part of this track")
+            bit = self._bit[layout.prefix]
+            slot['present'][bit // 8] |= 0x80 >> (bit % 8)
+            slot[layout.prefix] = np.frombuffer(layout.pack(values), dtype=np.uint8)
+        self._f.write(slot.tobytes())
+        self.count += 1
+
+    def append_slots(self, slots):
+        """
+        Append an array of already-built slots (dtype `self.dtype`).
+        """
+        slots = np.asarray(slots, dtype=self.dtype)
+        self._f.write(slots.tobytes())
+        self.count += len(slots)
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Track:
+    def __init__(self, path):
+        """
+        Open a track file read-only through mmap.
+        """
+        self.path = path
+        self._f = open(path, 'rb')
+        header, self.data_offset = unpack_header(self._f, TRACK_MAGIC)
+        self.window = header['window']
+        self.layouts = tuple(RecordLayout.from_header(h) for h in header['rules'])
+        self.dtype = slot_dtype(self.layouts)
+        self._bit = {layout.prefix: i for i, layout in enumerate(self.layouts)}
+        self._by_name = {layout.variable: layout for layout in self.layouts}
+        self._by_name.update({layout.prefix: layout for layout in self.layouts})
+        self._mm = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Re-map the file, picking up slots appended since it was opened.
+        A trailing partial slot (writer mid-append) is ignored.
+        """
+        self._release()
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        count = (len(self._mm) - self.data_offset) // self.dtype.itemsize
+        self.slots = np.frombuffer(self._mm, dtype=self.dtype, count=count,
+                                   offset=self.data_offset)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, i):
+        """
+        Slot(s) at window index `i` (int or slice), as zero-copy views.
+        """
+        return self.slots[i]
+
+    @property
+    def duration(self):
+        return len(self) * self.window
+
+    def index_at(self, t):
+        """
+        Index of the window containing time `t` (seconds).
+        """
+        return int(math.floor(t / self.window + 1e-9))
+
+    def time_of(self, i):
+        return i * self.window
+
+    def range(self, t0, t1):
+        """
+        Slots of every window overlapping [t0, t1) seconds, as a zero-copy view.
+        """
+        start = max(0, self.index_at(t0))
+        stop = min(len(self), int(math.ceil(t1 / self.window - 1e-9)))
+        return self.slots[start:max(start, stop)]
+
+    def _layout(self, rule):
+        layout = self._by_name.get(rule)
+        if layout is None:
+            raise RuleParseError(f"Rule '{rule}' is not part of this track")
+        return layout
+
+    def present(self, rule, slots=None):
+        """
+        Bool mask of which slots carry a record for `rule` (name or prefix).
+        """
+        slots = self.slots if slots is None else slots
+        bit = self._bit[self._layout(rule).prefix]
+        return (slots['present'][..., bit // 8] & (0x80 >> (bit % 8))) != 0
+
+    def records(self, rule, slots=None):
+        """
+        Decode `rule`'s records for `slots` (default: the whole track) into a
+        structured array of fields, plus the presence mask.
+        """
+        slots = self.slots if slots is None else np.atleast_1d(slots)
+        layout = self._layout(rule)
+        raw = np.ascontiguousarray(slots[layout.prefix])
+        return layout.unpack_records(raw), self.present(rule, slots)
+
+    def window_values(self, i):
+        """
+        Decode window `i` into { variable_name: nested_values } for present rules.
+        """
+        slot = self.slots[i]
+        out = {}
+        for layout in self.layouts:
+            if self.present(layout.prefix, slot):
+                out[layout.variable] = layout.unpack(slot[layout.prefix].tobytes())
+        return out
+
+    def _release(self):
+        self.slots = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # Views handed out earlier still reference the mapping; it is
+                # unmapped once the last of them is garbage-collected.
+                pass
+            self._mm = None
+
+    def close(self):
+        self._release()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_track(path):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Track file not found: '{path}'")
+    return Track(path)
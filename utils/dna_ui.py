@@ -2,24 +2,49 @@
 import os
 import json
 import csv
-from utils.dna_calculator import DNACalculator
+import time
+from collections import deque
+from itertools import chain, islice
+from utils.dna_calculator import DNACalculator, RuleParseError
+from utils.metrics import METRICS, BATCH_BUCKETS
+
+# Lines parsed per chunk in streaming mode
+STREAM_CHUNK_SIZE = 10000
+# Distinct DNA strings memoized by the calculator; consecutive windows of
+# sustained material repeat the same string very often
+PARSE_CACHE_SIZE = 65536
 
 def ensure_folder(path):
     if not os.path.isdir(path):
         os.makedirs(path, exist_ok=True)
 
-def read_input_file(input_path):
+def iter_input_file(input_path):
     """
-    Reads `toSequence.txt` under data/raw; each line is one DNA string.
-    Returns a list of DNA strings (stripped, non-empty).
+    Yield the DNA strings of `toSequence.txt` one at a time (stripped, non-empty).
     """
-    dna_list = []
     with open(input_path, 'r', encoding='utf-8') as f:
         for line in f:
             s = line.strip()
             if s:
-                dna_list.append(s)
-    return dna_list
+                yield s
+
+def read_input_file(input_path):
+    """
+    Reads `toSequence.txt` under data/raw; each line is one DNA string.
+    Returns a list of DNA strings (stripped, non-empty).
+    """
+    return list(iter_input_file(input_path))
+
+def iter_chunks(iterable, size):
+    """
+    Yield lists of up to `size` items from `iterable`.
+    """
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
 
 def flatten_parsed(rule_name, values_dict, parent_key=''):
     """
@@ -35,7 +60,220 @@ def flatten_parsed(rule_name, values_dict, parent_key=''):
             items[new_key] = v
     return items
 
-def main():
+def rule_columns(rule):
+    """
+    The flattened CSV column names of one rule, known from its schema
+    (same names flatten_parsed produces for that rule's values).
+    """
+    return [f"{rule.variable}.{'.'.join(field.path)}" for field in rule.fields]
+
+def csv_fieldnames(calculator):
+    """
+    Every column any loaded rule can produce, plus dna/rule/error.
+    """
+    keys = {'dna', 'rule', 'error'}
+    for rule in calculator.rules.values():
+        keys.update(rule_columns(rule))
+    return sorted(keys)
+
+def parse_entry(calculator, dna_str):
+    """
+    Parse one DNA string. Returns (json_entry, flat_csv_row); parse errors
+    become error entries instead of raising.
+    """
+    if METRICS.enabled:
+        return _parse_entry_metered(calculator, dna_str)
+    try:
+        result = calculator.parse(dna_str)
+    except RuleParseError as e:
+        return _error_entry(dna_str, e)
+    return _build_entry(dna_str, result)
+
+def _error_entry(dna_str, error):
+    return {'dna': dna_str, 'error': str(error)}, {'dna': dna_str, 'error': str(error)}
+
+def _build_entry(dna_str, result):
+    entry = {
+        'dna': dna_str,
+        'rule': result['rule'],
+        'parsed': result['values']
+    }
+    flat = flatten_parsed(result['rule'], result['values'])
+    flat['dna'] = dna_str
+    flat['rule'] = result['rule']
+    return entry, flat
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+
+def _parse_entry_metered(calculator, dna_str):
+    """
+    parse_entry, recording per-rule parse latency, errors and flatten time.
+    """
+    rule = calculator.match(dna_str)
+    label = rule.variable if rule is not None else 'unmatched'
+    start = time.perf_counter()
+    try:
+        result = calculator.parse(dna_str)
+    except RuleParseError as e:
+        METRICS.inc('sonicdna_parse_errors_total', rule=label)
+        return _error_entry(dna_str, e)
+    parsed = time.perf_counter()
+    out = _build_entry(dna_str, result)
+    done = time.perf_counter()
+    METRICS.observe('sonicdna_parse_seconds', parsed - start, rule=label)
+    METRICS.inc('sonicdna_parsed_total', rule=label)
+    METRICS.inc('sonicdna_stage_seconds_total', parsed - start, stage='parse')
+    METRICS.inc('sonicdna_stage_seconds_total', done - parsed, stage='flatten')
+    return out
+
+def _metered_input(dna_strings, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Pass `dna_strings` through, timing reads chunk by chunk and counting
+    lines and bytes.
+    """
+    it = iter(dna_strings)
+    while True:
+        with METRICS.stage('read'):
+            chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        METRICS.inc('sonicdna_lines_total', len(chunk))
+        METRICS.inc('sonicdna_input_bytes_total', sum(map(len, chunk)))
+        yield from chunk
+
+# ─── Process-pool parsing ─────────────────────────────────────────────────────
+
+# Lines handed to a worker process per task
+WORKER_CHUNK_SIZE = 5000
+
+_worker_calculator = None  # built once per worker process
+
+def _init_worker(rules_folder, metrics_enabled=False):
+    global _worker_calculator
+    _worker_calculator = DNACalculator(rules_folder=rules_folder,
+                                       parse_cache_size=PARSE_CACHE_SIZE)
+    # A forked worker inherits the parent's recorded metrics; start empty
+    METRICS.reset()
+    METRICS.enabled = metrics_enabled
+
+def _parse_chunk(chunk):
+    """
+    Parse one chunk in a worker. Returns (entries, metrics recorded for this
+    chunk or None) so the parent can merge worker metrics into its own.
+    """
+    entries = [parse_entry(_worker_calculator, dna_str) for dna_str in chunk]
+    return entries, METRICS.drain() if METRICS.enabled else None
+
+def _chunk_entries(future):
+    entries, metrics = future.result()
+    if metrics is not None:
+        METRICS.merge(metrics)
+    return entries
+
+def worker_pool(workers, rules_folder='rules'):
+    """
+    Start a process pool whose workers each build their DNACalculator from
+    `rules_folder` once. Pass it as `pool` to iter_parsed() / main() to reuse
+    it across batches (the watcher does); shut it down when done.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(rules_folder, METRICS.enabled))
+
+def iter_parsed(calculator, dna_strings, workers=1, rules_folder='rules',
+                chunk_size=WORKER_CHUNK_SIZE, pool=None):
+    """
+    Yield (json_entry, flat_csv_row) for each DNA string, in input order.
+    With workers > 1, chunks are parsed in a process pool: `pool` if given
+    (see worker_pool), else one started for this call. At most two chunks
+    per worker are in flight, so memory stays bounded. Input that fits in
+    one chunk (e.g. a typical watcher batch) is parsed in-process, since
+    shipping it to a worker would cost more than the parse.
+    """
+    if workers <= 1:
+        for dna_str in dna_strings:
+            yield parse_entry(calculator, dna_str)
+        return
+    chunks = iter_chunks(dna_strings, chunk_size)
+    first = next(chunks, [])
+    second = next(chunks, None)
+    if second is None:
+        for dna_str in first:
+            yield parse_entry(calculator, dna_str)
+        return
+    chunks = chain((first, second), chunks)
+    if pool is not None:
+        yield from _pool_entries(pool, chunks, workers)
+        return
+    with worker_pool(workers, rules_folder) as pool:
+        yield from _pool_entries(pool, chunks, workers)
+
+def _pool_entries(pool, chunks, workers):
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(_parse_chunk, chunk))
+        if len(pending) >= 2 * workers:
+            yield from _chunk_entries(pending.popleft())
+    while pending:
+        yield from _chunk_entries(pending.popleft())
+
+def run_streaming(calculator, dna_strings, output_folder, chunk_size=STREAM_CHUNK_SIZE,
+                  workers=1, rules_folder='rules', append=False, pool=None):
+    """
+    Constant-memory pipeline: read → parse chunk → append to NDJSON and CSV.
+    The CSV header comes from the rule schemas, so rows are written as they
+    are parsed. Both files are rewritten, or with `append` extended (the
+    watcher's batches; the CSV header is then only written to a new or empty
+    file). Returns (count, ndjson_path, csv_path).
+    """
+    ndjson_path = os.path.join(output_folder, 'toSequence_parsed.ndjson')
+    csv_path = os.path.join(output_folder, 'toSequence_parsed_stream.csv')
+    fieldnames = csv_fieldnames(calculator)
+    count = 0
+    mode = 'a' if append else 'w'
+    with open(ndjson_path, mode, encoding='utf-8') as jf, \
+            open(csv_path, mode, newline='', encoding='utf-8') as cf:
+        writer = csv.DictWriter(cf, fieldnames=fieldnames, restval='')
+        if cf.tell() == 0:
+            writer.writeheader()
+        parsed = iter_parsed(calculator, dna_strings, workers, rules_folder, pool=pool)
+        json_start, csv_start = jf.tell(), cf.tell()
+        for chunk in iter_chunks(parsed, chunk_size):
+            with METRICS.stage('json_write'):
+                jf.write('\n'.join(json.dumps(entry, separators=(',', ':')) for entry, _ in chunk) + '\n')
+            with METRICS.stage('csv_write'):
+                writer.writerows(flat for _, flat in chunk)
+            count += len(chunk)
+        if METRICS.enabled:
+            METRICS.inc('sonicdna_output_bytes_total', jf.tell() - json_start, file='ndjson')
+            METRICS.inc('sonicdna_output_bytes_total', cf.tell() - csv_start, file='csv')
+    return count, ndjson_path, csv_path
+
+def main(streaming=False, workers=1, dna_strings=None, columnar=False, append=False, pool=None):
+    """
+    Parse DNA strings into data/output. By default the strings are read from
+    data/raw/toSequence.txt; `dna_strings` parses the given lines instead
+    (used by the watcher to hand over only newly appended lines). With
+    `append`, streaming output is added to the existing files instead of
+    replacing them. `pool` (see worker_pool) is reused for workers > 1
+    instead of starting a new one.
+    With `columnar`, per-rule .npy column files are written instead of
+    JSON/CSV (see utils.dna_columns); columnar parsing is vectorized
+    in-process, so `workers` does not apply.
+    When utils.metrics is enabled, stage times, counters and latencies are
+    recorded into utils.metrics.METRICS.
+    """
+    if not METRICS.enabled:
+        return _run(streaming, workers, dna_strings, columnar, append, pool)
+    mode = 'columnar' if columnar else 'streaming' if streaming else 'batch'
+    start = time.perf_counter()
+    try:
+        return _run(streaming, workers, dna_strings, columnar, append, pool)
+    finally:
+        METRICS.observe('sonicdna_batch_seconds', time.perf_counter() - start,
+                        buckets=BATCH_BUCKETS, mode=mode)
+
+def _run(streaming, workers, dna_strings, columnar, append, pool):
     # Determine file paths
     project_root = os.getcwd()
     raw_folder = os.path.join(project_root, 'data', 'raw')
@@ -43,21 +281,55 @@ def main():
     ensure_folder(output_folder)
 
     input_file = os.path.join(raw_folder, 'toSequence.txt')
-    if not os.path.isfile(input_file):
-        print(f"[ERROR] Input file not found: {input_file}")
+    if dna_strings is None:
+        if not os.path.isfile(input_file):
+            print(f"[ERROR] Input file not found: {input_file}")
+            return
+        dna_strings = iter_input_file(input_file)
+    if METRICS.enabled:
+        dna_strings = _metered_input(dna_strings)
+
+    rules_folder = os.path.join(project_root, 'rules')
+    if streaming:
+        # All rules are loaded (cached) so the CSV columns are known up front
+        try:
+            calculator = DNACalculator(rules_folder=rules_folder,
+                                       parse_cache_size=PARSE_CACHE_SIZE)
+        except Exception as e:
+            print(f"[ERROR] Could not load rules: {e}")
+            return
+        count, ndjson_path, csv_path = run_streaming(calculator, dna_strings, output_folder,
+                                                     workers=workers, rules_folder=rules_folder,
+                                                     append=append, pool=pool)
+        if not count:
+            print("[WARN] No DNA strings found in toSequence.txt")
+            return
+        print(f"[OK] Parsed {count} DNA strings (streaming).")
+        print(f"     NDJSON → {ndjson_path}")
+        print(f"     CSV    → {csv_path}")
         return
 
-    # Instantiate calculator
+    # Read DNA strings
+    dna_list = [s.strip() for s in dna_strings if s.strip()]
+    if not dna_list:
+        print("[WARN] No DNA strings found in toSequence.txt")
+        return
+
+    # Instantiate calculator (cached, and only the rules this input uses)
     try:
-        calculator = DNACalculator(rules_folder=os.path.join(project_root, 'rules'))
+        calculator = DNACalculator(rules_folder=rules_folder, needed_for=dna_list,
+                                   parse_cache_size=PARSE_CACHE_SIZE)
     except Exception as e:
         print(f"[ERROR] Could not load rules: {e}")
         return
 
-    # Read DNA strings
-    dna_list = read_input_file(input_file)
-    if not dna_list:
-        print("[WARN] No DNA strings found in toSequence.txt")
+    if columnar:
+        from utils.dna_columns import write_columnar
+        columns_folder = os.path.join(output_folder, 'toSequence_columns')
+        with METRICS.stage('columnar'):
+            manifest_path, count, errors = write_columnar(calculator, dna_list, columns_folder)
+        print(f"[OK] Parsed {count} DNA strings ({errors} errors), columnar.")
+        print(f"     Manifest → {manifest_path}")
         return
 
     # Prepare outputs
@@ -65,43 +337,20 @@ def main():
     csv_rows = []
     all_flattened_keys = set()
 
-    for dna_str in dna_list:
-        try:
-            result = calculator.parse(dna_str)
-            entry = {
-                'dna': dna_str,
-                'rule': result['rule'],
-                'parsed': result['values']
-            }
-            parsed_json.append(entry)
-
-            # Flatten for CSV
-            flat = flatten_parsed(result['rule'], result['values'])
-            flat['dna'] = dna_str
-            flat['rule'] = result['rule']
-            csv_rows.append(flat)
-            all_flattened_keys.update(flat.keys())
-
-        except RuleParseError as e:
-            # On parse error, record as error entry
-            parsed_json.append({
-                'dna': dna_str,
-                'error': str(e)
-            })
-            # Also put a row in CSV listing error
-            flat = {'dna': dna_str, 'error': str(e)}
-            csv_rows.append(flat)
-            all_flattened_keys.update(flat.keys())
+    for entry, flat in iter_parsed(calculator, dna_list, workers, rules_folder, pool=pool):
+        parsed_json.append(entry)
+        csv_rows.append(flat)
+        all_flattened_keys.update(flat.keys())
 
     # 1) Write JSON output
     json_output_path = os.path.join(output_folder, 'toSequence_parsed.json')
-    with open(json_output_path, 'w', encoding='utf-8') as jf:
+    with METRICS.stage('json_write'), open(json_output_path, 'w', encoding='utf-8') as jf:
         json.dump(parsed_json, jf, indent=2)
 
     # 2) Write CSV output
     csv_output_path = os.path.join(output_folder, 'toSequence_parsed.csv')
     fieldnames = sorted(all_flattened_keys)
-    with open(csv_output_path, 'w', newline='', encoding='utf-8') as cf:
+    with METRICS.stage('csv_write'), open(csv_output_path, 'w', newline='', encoding='utf-8') as cf:
         writer = csv.DictWriter(cf, fieldnames=fieldnames)
         writer.writeheader()
         for row in csv_rows:
@@ -109,6 +358,10 @@ def main():
             out = {k: row.get(k, '') for k in fieldnames}
             writer.writerow(out)
 
+    if METRICS.enabled:
+        METRICS.inc('sonicdna_output_bytes_total', os.path.getsize(json_output_path), file='json')
+        METRICS.inc('sonicdna_output_bytes_total', os.path.getsize(csv_output_path), file='csv')
+
     print(f"[OK] Parsed {len(dna_list)} DNA strings.")
     print(f"     JSON → {json_output_path}")
     print(f"     CSV  → {csv_output_path}")
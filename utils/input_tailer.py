@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+input_tailer.py
+
+Follows data/raw/toSequence.txt by byte offset instead of re-reading and
+truncating it:
+
+  • only bytes appended since the last read are parsed (complete lines only;
+    a half-written last line waits for its newline)
+  • the offset is committed to `<file>.offset` after the consumer has handled
+    a batch, so a restart resumes where it stopped
+  • once enough has been consumed the file is rotated: renamed to
+    `<file>.rotating`, so writers that open the file per write start a fresh
+    one. Writers that keep the old file open still append to the rotated
+    file, so it is followed by its own offset and only removed after it has
+    stayed unchanged for ROTATE_GRACE_SECONDS
+  • wake-ups come from watchdog file events; without watchdog a cheap
+    os.stat size poll is used
+
+A writer that holds the file open and stays silent for longer than the grace
+period loses what it writes after the rotated file is removed; such writers
+should reopen the file for each batch of lines.
+"""
+
+import json
+import os
+import threading
+import time
+
+# Rotate the input once this many consumed bytes have piled up in it
+COMPACT_BYTES = 1 << 20
+# A rotated file is removed once it has not changed for this long
+ROTATE_GRACE_SECONDS = 5.0
+# Poll interval when watchdog is unavailable, and safety-net wake-up otherwise
+POLL_SECONDS = 0.05
+WATCHDOG_TIMEOUT = 1.0
+
+class InputTailer:
+    def __init__(self, path, compact_bytes=COMPACT_BYTES, grace_seconds=ROTATE_GRACE_SECONDS):
+        self.path = os.path.abspath(path)
+        self.state_path = self.path + '.offset'
+        self.rotated_path = self.path + '.rotating'
+        self.compact_bytes = compact_bytes
+        self.grace_seconds = grace_seconds
+        self.offset, self._ino, self.rotated_offset = self._load_state()
+        if self.rotated_offset is None and os.path.exists(self.rotated_path):
+            # Stopped between the rename and the state save: the committed
+            # offset still belongs to the file that is now the rotated one
+            same = self._ino is not None and os.stat(self.rotated_path).st_ino == self._ino
+            self.rotated_offset = self.offset if same else 0
+            self.offset, self._ino = 0, None
+        self._rotated_size = None
+        self._quiet_since = None
+        self._wake = threading.Event()
+        self._observer = None
+
+    # ─── Offset state ──────────────────────────────────────────────────────
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            rotated = state.get('rotated_offset')
+            return (int(state.get('offset', 0)), state.get('ino'),
+                    None if rotated is None else int(rotated))
+        except (OSError, ValueError):
+            return 0, None, None
+
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'offset': self.offset, 'ino': self._ino,
+                       'rotated_offset': self.rotated_offset}, f)
+        os.replace(tmp_path, self.state_path)
+
+    # ─── Reading ───────────────────────────────────────────────────────────
+
+    def read_new(self):
+        """
+        Return (lines, end_offset) for complete lines appended after the
+        committed offset. Does not advance the offset; see commit().
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [], self.offset
+        if st.st_ino != self._ino or st.st_size < self.offset:
+            # New file (rotated / recreated) or truncated by someone else
+            self._ino = st.st_ino
+            self.offset = 0
+        return _read_lines(self.path, self.offset, st.st_size)
+
+    def commit(self, end_offset):
+        """
+        Mark everything before `end_offset` as processed.
+        """
+        self.offset = end_offset
+        self._save_state()
+
+    # ─── Rotation ──────────────────────────────────────────────────────────
+
+    def rotate(self):
+        """
+        Rename the input to the rotated path once its consumed prefix is
+        large, unless an earlier rotated file is still being drained. The
+        rest of the old file is then read by read_rotated(). Returns True if
+        the file was rotated.
+        """
+        if self.rotated_offset is not None or self.offset < self.compact_bytes:
+            return False
+        try:
+            os.replace(self.path, self.rotated_path)
+        except FileNotFoundError:
+            return False
+        self.rotated_offset, self.offset, self._ino = self.offset, 0, None
+        self._rotated_size = None
+        self._save_state()
+        return True
+
+    def read_rotated(self):
+        """
+        Return (lines, end_offset) for complete lines in the rotated file
+        past its offset. Once the file has not changed for the grace period,
+        an unterminated last line is returned too: its writer has stopped.
+        """
+        try:
+            size = os.stat(self.rotated_path).st_size
+        except FileNotFoundError:
+            return [], self.rotated_offset
+        now = time.monotonic()
+        if size != self._rotated_size:
+            self._rotated_size, self._quiet_since = size, now
+        lines, end = _read_lines(self.rotated_path, self.rotated_offset, size)
+        if end == self.rotated_offset < size and self.rotated_quiet():
+            with open(self.rotated_path, 'rb') as f:
+                f.seek(end)
+                lines, end = _decode_lines(f.read(size - end)), size
+        return lines, end
+
+    def commit_rotated(self, end_offset):
+        self.rotated_offset = end_offset
+        self._save_state()
+
+    def rotated_quiet(self):
+        return (self._quiet_since is not None
+                and time.monotonic() - self._quiet_since >= self.grace_seconds)
+
+    def finish_rotation(self):
+        """
+        Remove the rotated file if everything in it has been committed and
+        it has stayed unchanged for the grace period. Returns True once no
+        rotated file is left.
+        """
+        try:
+            size = os.stat(self.rotated_path).st_size
+        except FileNotFoundError:
+            size = None
+        if size is not None:
+            if size != self._rotated_size or size > self.rotated_offset or not self.rotated_quiet():
+                return False
+            os.remove(self.rotated_path)
+        self.rotated_offset = None
+        self._rotated_size = self._quiet_since = None
+        self._save_state()
+        return True
+
+    # ─── Waiting ───────────────────────────────────────────────────────────
+
+    def _start_observer(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+
+        tailer = self
+        watched = (self.path, self.rotated_path)
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = (getattr(event, 'src_path', ''), getattr(event, 'dest_path', ''))
+                if any(os.path.abspath(p) in watched for p in paths if p):
+                    tailer._wake.set()
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), os.path.dirname(self.path), recursive=False)
+        self._observer.start()
+        return True
+
+    def follow(self, stop_event=None):
+        """
+        Generator yielding lists of new lines as they are appended (to the
+        input, or to a rotated file that is still being drained). The offset
+        for a batch is committed when the consumer asks for the next one.
+        """
+        timeout = WATCHDOG_TIMEOUT if self._start_observer() else POLL_SECONDS
+        try:
+            while stop_event is None or not stop_event.is_set():
+                self._wake.clear()
+                if self.rotated_offset is not None:
+                    lines, end = self.read_rotated()
+                    if end != self.rotated_offset:
+                        if lines:
+                            yield lines
+                        self.commit_rotated(end)
+                        continue
+                    self.finish_rotation()
+                lines, end = self.read_new()
+                if end != self.offset:
+                    if lines:
+                        yield lines
+                    self.commit(end)
+                    self.rotate()
+                    continue
+                self._wake.wait(timeout)
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+def _read_lines(path, offset, size):
+    """
+    Complete lines of `path` between `offset` and `size`, and the offset just
+    past the last newline.
+    """
+    if size <= offset:
+        return [], offset
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    end = data.rfind(b'\n')
+    if end < 0:
+        return [], offset
+    return _decode_lines(data[:end + 1]), offset + end + 1
+
+def _decode_lines(data):
+    return [s for s in (line.strip() for line in data.decode('utf-8').splitlines()) if s]
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+metrics.py
+
+Lightweight in-process metrics for the parse pipeline:
+
+  • counters    – lines, bytes, parse errors per rule, time spent per stage
+  • histograms  – per-line parse latency per rule, per-run batch latency
+
+Everything goes into the module-level METRICS registry, which is disabled
+(and costs one attribute check per line) until enable() is called, e.g. by
+`main.py --metrics PATH`. The registry is written in the Prometheus text
+exposition format, so the file can be picked up by node_exporter's textfile
+collector or simply read.
+
+RunProfiler wraps runs in cProfile for `main.py --profile`.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-line parse latency (seconds)
+LINE_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+# Whole-batch latency (seconds)
+BATCH_BUCKETS = (1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+
+# name -> (type, help) for every metric the pipeline reports
+METRIC_HELP = {
+    'sonicdna_lines_total': ('counter', "DNA lines read from the input."),
+    'sonicdna_input_bytes_total': ('counter', "Bytes of DNA input read (excluding newlines)."),
+    'sonicdna_output_bytes_total': ('counter', "Bytes written per output file kind."),
+    'sonicdna_parsed_total': ('counter', "DNA lines parsed successfully per rule."),
+    'sonicdna_parse_errors_total': ('counter', "DNA lines that failed to parse per rule ('unmatched' if no rule)."),
+    'sonicdna_stage_seconds_total': ('counter', "Time spent per pipeline stage."),
+    'sonicdna_parse_seconds': ('histogram', "Per-line parse latency per rule."),
+    'sonicdna_batch_seconds': ('histogram', "End-to-end latency of one dna_ui.main run."),
+}
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, counts, total, count):
+        for i, c in enumerate(counts):
+            self.counts[i] += c
+        self.sum += total
+        self.count += count
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}    # (name, labels) -> number
+        self.histograms = {}  # (name, labels) -> Histogram
+        self._lock = threading.Lock()
+
+    # ─── Recording ─────────────────────────────────────────────────────────
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LINE_BUCKETS, **labels):
+        key = (name, _labels(labels))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram(buckets)
+        hist.observe(value)
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Add the time spent in the `with` block to the stage's total.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.inc('sonicdna_stage_seconds_total', time.perf_counter() - start, stage=stage)
+
+    # ─── Snapshots (used to ship worker-process metrics back) ──────────────
+
+    def drain(self):
+        """
+        Return the recorded state as plain data and reset the registry.
+        """
+        with self._lock:
+            state = {
+                'counters': self.counters,
+                'histograms': {k: (h.buckets, h.counts, h.sum, h.count)
+                               for k, h in self.histograms.items()},
+            }
+            self.counters = {}
+            self.histograms = {}
+        return state
+
+    def merge(self, state):
+        with self._lock:
+            for key, value in state['counters'].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, (buckets, counts, total, count) in state['histograms'].items():
+                hist = self.histograms.get(key)
+                if hist is None:
+                    hist = self.histograms[key] = Histogram(buckets)
+                hist.merge(counts, total, count)
+
+    def reset(self):
+        self.drain()
+
+    # ─── Export ────────────────────────────────────────────────────────────
+
+    def to_prometheus(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name in described:
+                return
+            described.add(name)
+            help_text = METRIC_HELP.get(name, (kind, ''))[1]
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), hist in histograms:
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(hist.buckets + (float('inf'),), hist.counts):
+                cumulative += count
+                le = (('le', _format_value(float(bound))),)
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(hist.sum)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Atomically (re)write the metrics file at `path`.
+        """
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        """
+        Short human-readable lines: time per stage, then the slowest rules.
+        """
+        stages = {dict(labels)['stage']: v for (name, labels), v in self.counters.items()
+                  if name == 'sonicdna_stage_seconds_total'}
+        out = ["Stage times: " + ', '.join(f"{k} {v * 1000:.1f} ms" for k, v in sorted(stages.items()))]
+        rules = [(h.sum / h.count, dict(labels)['rule'], h.count)
+                 for (name, labels), h in self.histograms.items()
+                 if name == 'sonicdna_parse_seconds' and h.count]
+        for mean, rule, count in sorted(rules, reverse=True)[:5]:
+            out.append(f"  {rule:<22} {mean * 1e6:7.2f} µs/line over {count} lines")
+        return out
+
+METRICS = Metrics()
+
+def enable():
+    METRICS.enabled = True
+    return METRICS
+
+class RunProfiler:
+    """
+    Accumulates cProfile stats over one or more `with` blocks (e.g. every
+    watcher batch) and dumps them to `path` after each block. With `top`,
+    the most expensive functions by cumulative time are also printed.
+    """
+
+    def __init__(self, path, top=0):
+        self.path = path
+        self.top = top
+        import cProfile  # only profiled runs pay for the import
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.dump()
+        return False
+
+    def dump(self):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        self.profile.dump_stats(self.path)
+        if self.top:
+            import io
+            import pstats
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats('cumulative').print_stats(self.top)
+            print(out.getvalue())